@@ -1,15 +1,28 @@
 import os
 import csv
+from collections import namedtuple
 from io import StringIO
-from flask import Flask, redirect, url_for, request, Response
+from flask import Flask, redirect, url_for, request, Response, current_app, flash
 from flask_login import current_user
 from flask_admin.contrib.sqla import ModelView
+from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import timezone, datetime
 from .extensions import db, login_manager, admin, bcrypt 
-from .models import Usuario, Reserva, Room 
+from .models import Usuario, Reserva, Room, data_para_dia, dia_para_data
 from flask_admin import BaseView, expose, AdminIndexView 
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from .cli import init_cli
+from .cache import invalidacao
+from .uniqueness import unicidade
+from .migrations import atualizar_esquema
+from .availability import disponibilidade
+from .catalog import catalogo_salas
+from .analytics import exportar_snapshot
+from . import routing
+from .routing import somente_leitura
+from .ratelimit import limitador
+from .events import leitor_eventos, publicar_reserva, RESERVA_CRIADA, RESERVA_CANCELADA, RESERVA_ALTERADA
 
 # --- CLASSE MIX-IN DE SEGURANÇA ---
 class SecureBaseViewMixin:
@@ -24,10 +37,12 @@ class SecureBaseViewMixin:
 # --- CLASSE PARA O DASHBOARD CUSTOMIZADO ---
 class MyAdminIndexView(SecureBaseViewMixin, AdminIndexView):
     @expose('/')
+    @somente_leitura
     def index(self):
         total_reservas = Reserva.query.count()
         total_rooms = Room.query.count()
-        ultimas = Reserva.query.order_by(Reserva.id.desc()).limit(5).all()
+        # A sala de cada linha vem no mesmo SELECT (sem uma consulta por reserva)
+        ultimas = Reserva.query.options(joinedload(Reserva.room)).order_by(Reserva.id.desc()).limit(5).all()
         
         return self.render('admin/dashboard.html', 
                            total_reservas=total_reservas,
@@ -39,26 +54,54 @@ class BaseAdminView(SecureBaseViewMixin, ModelView):
     pass
 
 class RoomAdminView(BaseAdminView):
-    pass
+    # Cursor de sincronização, mantido automaticamente
+    form_excluded_columns = ('versao',)
+
+    # Salas alteradas pelo painel: o catálogo compartilhado é remontado no próximo uso
+    def after_model_change(self, form, model, is_created):
+        catalogo_salas.invalidar()
+
+    def after_model_delete(self, model):
+        catalogo_salas.invalidar()
 
 class ReservaAdminView(BaseAdminView):
-    pass
+    # Colunas derivadas de start_time/end_time (mantidas pelos eventos do modelo)
+    column_exclude_list = ('start_minute', 'end_minute', 'day_key', 'versao')
+    form_excluded_columns = ('start_minute', 'end_minute', 'day_key', 'versao')
+
+    # Edições pelo painel podem mover/cancelar qualquer reserva: remonta o índice e avisa os streams
+    def after_model_change(self, form, model, is_created):
+        disponibilidade.invalidar()
+        if is_created:
+            publicar_reserva(RESERVA_CRIADA, model)
+        elif model.status != 'reserved':
+            publicar_reserva(RESERVA_CANCELADA, model)
+        else:
+            publicar_reserva(RESERVA_ALTERADA, model)
+
+    def after_model_delete(self, model):
+        disponibilidade.invalidar()
+        # O flush da exclusão já gravou o reserva_cancelada em eventos_reserva
+        leitor_eventos.sincronizar()
 
 class UsuarioAdminView(BaseAdminView):
     column_exclude_list = ('password',)
     form_excluded_columns = ('password',)
 
 # --- CLASSE DE RELATÓRIO ---
+LinhaRelatorio = namedtuple('LinhaRelatorio', ['data', 'total_reservas'])
+
 class RelatorioReservasView(SecureBaseViewMixin, BaseView):
     def _obter_dados_reservas(self, data_inicio_obj=None, data_fim_obj=None):
-        data_coluna = Reserva.start_time
-        data_agrupada = func.date(data_coluna).label('data')
-        query = db.session.query(data_agrupada, func.count(Reserva.id).label('total_reservas')).group_by(data_agrupada).order_by(data_agrupada)
-        if data_inicio_obj: query = query.filter(data_coluna >= data_inicio_obj)
-        if data_fim_obj: query = query.filter(data_coluna <= data_fim_obj.replace(hour=23, minute=59, second=59))
-        return query.all()
+        # Agrupa pela chave de dia inteira (usa o índice, ao contrário de func.date(start_time))
+        dia = Reserva.day_key
+        query = db.session.query(dia, func.count(Reserva.id).label('total_reservas')).group_by(dia).order_by(dia)
+        if data_inicio_obj: query = query.filter(dia >= data_para_dia(data_inicio_obj))
+        if data_fim_obj: query = query.filter(dia <= data_para_dia(data_fim_obj))
+        return [LinhaRelatorio(dia_para_data(item.day_key), item.total_reservas) for item in query.all()]
 
     @expose('/')
+    @somente_leitura
     def index(self):
         relatorio = self._obter_dados_reservas()
         labels = [str(item.data) for item in relatorio]
@@ -69,7 +112,19 @@ class RelatorioReservasView(SecureBaseViewMixin, BaseView):
                            data_values=data_values, 
                            name="Relatório Diário")
 
+    @expose('/snapshot/', methods=['POST'])
+    def snapshot_analitico(self):
+        # Snapshot colunar para o BI (lido por memory-map, fora do SQLite)
+        try:
+            diretorio, contagens = exportar_snapshot(current_app.config['ANALYTICS_DIR'], manter=5)
+        except RuntimeError as e:
+            flash(str(e), 'error')
+        else:
+            flash(f"Snapshot analítico gerado em {diretorio} ({contagens['reservas']} reservas).", 'success')
+        return redirect(url_for('.index'))
+
     @expose('/export/')
+    @somente_leitura
     def export_csv(self):
         relatorio = self._obter_dados_reservas()
         si = StringIO()
@@ -90,8 +145,31 @@ def create_app(config_class=None):
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['FLASK_ADMIN_SWATCH'] = 'darkly' 
+    # Pré-checagens de unicidade no cadastro; '0' deixa a garantia só com a constraint do banco
+    app.config['UNIQUENESS_PRECHECK'] = os.environ.get('UNIQUENESS_PRECHECK', '1') != '0'
+    # Engine de leitura (réplica); sem ela, o próprio SQLite é aberto em modo somente leitura
+    app.config['SQLALCHEMY_READ_URI'] = os.environ.get('SQLALCHEMY_READ_URI')
+    # Destino dos snapshots analíticos (flask export-analytics / botão no Relatório)
+    app.config['ANALYTICS_DIR'] = os.environ.get('ANALYTICS_DIR', os.path.join(app.instance_path, 'analytics'))
+    # Migrações de esquema na inicialização; com AUTO_MIGRATE=0 ficam só com `flask upgrade-db`
+    app.config['AUTO_MIGRATE'] = os.environ.get('AUTO_MIGRATE', '1') != '0'
+    # Streams SSE abertos por worker (cada um ocupa um thread no gthread); os excedentes recebem 503
+    app.config['SSE_MAX_STREAMS'] = int(os.environ.get('SSE_MAX_STREAMS', '24'))
+
+    # Proxies reversos na frente da aplicação (nginx etc.); 0 = acesso direto.
+    # Com o valor certo, request.remote_addr é o IP do cliente (usado pelo limitador de requisições)
+    app.config['TRUSTED_PROXIES'] = int(os.environ.get('TRUSTED_PROXIES', '0'))
+
+    # Configuração extra (ex.: a dos testes) sobrescreve os padrões acima
+    if config_class is not None:
+        app.config.from_object(config_class)
+
+    if app.config['TRUSTED_PROXIES']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
     
     db.init_app(app) 
+    routing.init_app(app, db)
+    limitador.init_app(app)
     bcrypt.init_app(app)
     login_manager.init_app(app)
 
@@ -114,13 +192,33 @@ def create_app(config_class=None):
     @login_manager.user_loader
     def load_user(user_id):
         return db.session.get(Usuario, int(user_id))
+
+    # Datas gravadas pelo SQLite voltam sem fuso: trata como UTC para comparar com datetime.now(timezone.utc)
+    @app.template_filter('ensure_utc')
+    def ensure_utc(valor):
+        if valor is not None and valor.tzinfo is None:
+            return valor.replace(tzinfo=timezone.utc)
+        return valor
     
     from .routes import main_bp
     app.register_blueprint(main_bp)
+
+    from .api.routes import api_bp
+    app.register_blueprint(api_bp)
     
     init_cli(app)
 
     with app.app_context():
         db.create_all()
+        if app.config['AUTO_MIGRATE']:
+            # Resumo guardado para o `flask upgrade-db`: a CLI carrega o app (e migra) antes do comando
+            app.extensions['migracao_inicial'] = atualizar_esquema()
+        # Lê as versões antes de montar os caches, para não perder escritas feitas no meio
+        invalidacao.verificar()
+        leitor_eventos.iniciar()
+        unicidade.aquecer()
+
+    # Conferência barata (PRAGMA data_version) das escritas feitas por outros workers
+    app.before_request(invalidacao.verificar)
 
     return app
\ No newline at end of file
@@ -9,6 +9,8 @@ from ..decorators import admin_required
 from ..models import Reserva, Room, Usuario
 from ..extensions import db
 from ..forms import RoomForm # Importa RoomForm do nível superior
+from ..events import publicar_reserva, RESERVA_CANCELADA
+from ..catalog import catalogo_salas
 
 
 # Define o Blueprint para as rotas de ADMIN
@@ -23,7 +25,7 @@ admin_bp = Blueprint('admin_bp', __name__, url_prefix='/admin')
 @admin_required # ⬅️ Aqui está o decorador de segurança
 def dashboard():
     todas_reservas = Reserva.query.order_by(
-        Reserva.start_time.asc()
+        Reserva.start_minute.asc()
     ).all()
     
     todas_salas = Room.query.all()
@@ -69,6 +71,7 @@ def adicionar_sala():
         )
         db.session.add(nova_sala)
         db.session.commit()
+        catalogo_salas.invalidar()
         flash(f"Sala '{nova_sala.name}' adicionada com sucesso!", 'success')
         # Redireciona para o mesmo Blueprint: .gerenciar_salas
         return redirect(url_for('.gerenciar_salas')) 
@@ -102,6 +105,7 @@ def editar_sala(sala_id):
         sala.is_active = form.is_active.data
         
         db.session.commit()
+        catalogo_salas.invalidar()
         flash(f"Sala '{sala.name}' atualizada com sucesso!", 'success')
         return redirect(url_for('.gerenciar_salas'))
     
@@ -132,6 +136,7 @@ def admin_cancelar_reserva(reserva_id):
     reserva.cancelled_at = datetime.now(timezone.utc)
     
     db.session.commit()
+    publicar_reserva(RESERVA_CANCELADA, reserva)
     username = reserva.reserver.username if reserva.reserver else "Usuário Desconhecido"
     flash(f"Reserva #{reserva.id} de {username} cancelada pelo Admin.", "success")
     
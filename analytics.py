@@ -0,0 +1,258 @@
+import os
+import shutil
+from datetime import datetime, timezone
+
+# Importações Locais
+from .extensions import db
+from .models import Reserva, Room, Usuario, dia_para_data
+
+# Dependência opcional: só os snapshots analíticos precisam do pyarrow
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# ====================================================================
+# SNAPSHOTS ANALÍTICOS (colunares)
+# A equipe de BI lia a tabela de reservas ao vivo. Aqui as reservas e as
+# dimensões (salas/usuários) são exportadas em lotes para arquivos Arrow IPC
+# (ou Parquet), particionados por mês. A leitura faz memory-map dos arquivos,
+# então os relatórios pesados não disputam o SQLite com as reservas.
+#
+# Layout: <destino>/snapshot-AAAAMMDDTHHMMSS_micros/
+#             salas.arrow, usuarios.arrow
+#             reservas/mes=AAAA-MM/parte-0.arrow
+# ====================================================================
+
+FORMATOS = ('arrow', 'parquet')
+PREFIXO_SNAPSHOT = 'snapshot-'
+TAMANHO_LOTE = 10000
+
+def _exigir_pyarrow():
+    if pa is None:
+        raise RuntimeError("Os snapshots analíticos precisam do pacote 'pyarrow' (pip install pyarrow).")
+
+def _esquemas():
+    utc = pa.timestamp('us', tz='UTC')
+    return {
+        'reservas': pa.schema([
+            ('id', pa.int64()),
+            ('room_id', pa.int32()),
+            ('user_id', pa.int32()),
+            ('status', pa.string()),
+            ('start_time', utc),
+            ('end_time', utc),
+            ('start_minute', pa.int64()),
+            ('end_minute', pa.int64()),
+            ('day_key', pa.int32()),
+            ('created_at', utc),
+            ('cancelled_at', utc),
+        ]),
+        'salas': pa.schema([
+            ('id', pa.int32()),
+            ('name', pa.string()),
+            ('description', pa.string()),
+            ('capacity', pa.int32()),
+            ('is_active', pa.bool_()),
+        ]),
+        # Sem e-mail nem hash de senha: só o necessário para os relatórios
+        'usuarios': pa.schema([
+            ('id', pa.int32()),
+            ('username', pa.string()),
+            ('is_admin', pa.bool_()),
+        ]),
+    }
+
+COLUNAS = {
+    'reservas': (Reserva, ('id', 'room_id', 'user_id', 'status', 'start_time', 'end_time',
+                           'start_minute', 'end_minute', 'day_key', 'created_at', 'cancelled_at')),
+    'salas': (Room, ('id', 'name', 'description', 'capacity', 'is_active')),
+    'usuarios': (Usuario, ('id', 'username', 'is_admin')),
+}
+
+
+class _Escritor:
+    """Abre um writer Arrow IPC ou Parquet com a mesma interface."""
+
+    def __init__(self, caminho, esquema, formato):
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        if formato == 'parquet':
+            self._writer = pq.ParquetWriter(caminho, esquema)
+        else:
+            self._sink = pa.OSFile(caminho, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, esquema)
+        self.formato = formato
+
+    def escrever(self, lote):
+        self._writer.write_batch(lote)
+
+    def fechar(self):
+        self._writer.close()
+        if self.formato != 'parquet':
+            self._sink.close()
+
+
+def _lote(linhas, esquema):
+    colunas = list(zip(*linhas))
+    return pa.record_batch(
+        [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, esquema)],
+        schema=esquema,
+    )
+
+def _mes(day_key):
+    return dia_para_data(day_key).strftime('%Y-%m') if day_key is not None else 'sem-data'
+
+def _exportar_tabela(conn, nome, esquema, caminho, formato, tamanho_lote):
+    modelo, colunas = COLUNAS[nome]
+    resultado = conn.execution_options(yield_per=tamanho_lote).execute(
+        db.select(*[getattr(modelo, c) for c in colunas]).order_by(modelo.id)
+    )
+    escritor = _Escritor(caminho, esquema, formato)
+    total = 0
+    try:
+        for linhas in resultado.partitions():
+            escritor.escrever(_lote(linhas, esquema))
+            total += len(linhas)
+    finally:
+        escritor.fechar()
+    return total
+
+def _exportar_reservas(conn, esquema, diretorio, formato, tamanho_lote):
+    """Reservas em ordem de dia, um arquivo por mês, escritas lote a lote."""
+    modelo, colunas = COLUNAS['reservas']
+    resultado = conn.execution_options(yield_per=tamanho_lote).execute(
+        db.select(*[getattr(modelo, c) for c in colunas]).order_by(modelo.day_key, modelo.id)
+    )
+    indice_dia = colunas.index('day_key')
+    escritor, mes_atual, total = None, None, 0
+    try:
+        for linhas in resultado.partitions():
+            # Quebra o lote onde o mês muda
+            inicio = 0
+            for i, linha in enumerate(linhas):
+                mes = _mes(linha[indice_dia])
+                if mes != mes_atual:
+                    if escritor and i > inicio:
+                        escritor.escrever(_lote(linhas[inicio:i], esquema))
+                    if escritor:
+                        escritor.fechar()
+                    caminho = os.path.join(diretorio, 'reservas', f'mes={mes}', f'parte-0.{formato}')
+                    escritor, mes_atual, inicio = _Escritor(caminho, esquema, formato), mes, i
+            if escritor and inicio < len(linhas):
+                escritor.escrever(_lote(linhas[inicio:], esquema))
+            total += len(linhas)
+    finally:
+        if escritor:
+            escritor.fechar()
+    return total
+
+
+def exportar_snapshot(destino, formato='arrow', tamanho_lote=TAMANHO_LOTE, manter=None):
+    """Gera um snapshot novo em `destino` e retorna (diretório, {tabela: linhas})."""
+    _exigir_pyarrow()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato} (use {', '.join(FORMATOS)})")
+
+    nome = PREFIXO_SNAPSHOT + datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S_%f')
+    final = os.path.join(destino, nome)
+    temporario = os.path.join(destino, '.' + nome)
+    esquemas = _esquemas()
+    contagens = {}
+
+    # Uma conexão só, lendo cada tabela em lotes (sem carregar tudo em memória)
+    try:
+        with db.engine.connect() as conn:
+            for tabela in ('salas', 'usuarios'):
+                contagens[tabela] = _exportar_tabela(
+                    conn, tabela, esquemas[tabela], os.path.join(temporario, f'{tabela}.{formato}'),
+                    formato, tamanho_lote,
+                )
+            contagens['reservas'] = _exportar_reservas(conn, esquemas['reservas'], temporario, formato, tamanho_lote)
+    except Exception:
+        shutil.rmtree(temporario, ignore_errors=True)
+        raise
+
+    # O snapshot só aparece para os leitores quando está completo
+    os.rename(temporario, final)
+
+    if manter:
+        for antigo in listar_snapshots(destino)[:-manter]:
+            shutil.rmtree(antigo, ignore_errors=True)
+    return final, contagens
+
+
+def listar_snapshots(destino):
+    """Diretórios de snapshots completos, do mais antigo ao mais recente."""
+    if not os.path.isdir(destino):
+        return []
+    return sorted(
+        os.path.join(destino, nome) for nome in os.listdir(destino) if nome.startswith(PREFIXO_SNAPSHOT)
+    )
+
+
+# -------------------------
+# Leitura (memory-mapped)
+# -------------------------
+class SnapshotAnalitico:
+    """Leitor de um snapshot. Arquivos Arrow IPC são mapeados em memória (zero-cópia)."""
+
+    def __init__(self, diretorio):
+        _exigir_pyarrow()
+        self.diretorio = diretorio
+
+    @classmethod
+    def mais_recente(cls, destino):
+        snapshots = listar_snapshots(destino)
+        return cls(snapshots[-1]) if snapshots else None
+
+    @staticmethod
+    def _ler(caminho):
+        if caminho.endswith('.parquet'):
+            return pq.read_table(caminho, memory_map=True)
+        # Os buffers da tabela apontam direto para o arquivo mapeado (mantêm o mapa vivo)
+        return pa.ipc.open_file(pa.memory_map(caminho, 'r')).read_all()
+
+    def _arquivo(self, tabela):
+        for formato in FORMATOS:
+            caminho = os.path.join(self.diretorio, f'{tabela}.{formato}')
+            if os.path.exists(caminho):
+                return caminho
+        raise FileNotFoundError(f'{tabela} não encontrada em {self.diretorio}')
+
+    def salas(self):
+        return self._ler(self._arquivo('salas'))
+
+    def usuarios(self):
+        return self._ler(self._arquivo('usuarios'))
+
+    def reservas(self, meses=None):
+        """Tabela de reservas; `meses` ('AAAA-MM') lê só as partições pedidas."""
+        base = os.path.join(self.diretorio, 'reservas')
+        particoes = sorted(os.listdir(base)) if os.path.isdir(base) else []
+        if meses is not None:
+            particoes = [p for p in particoes if p.split('=', 1)[-1] in set(meses)]
+        tabelas = [
+            self._ler(os.path.join(base, particao, arquivo))
+            for particao in particoes
+            for arquivo in sorted(os.listdir(os.path.join(base, particao)))
+        ]
+        if not tabelas:
+            return _esquemas()['reservas'].empty_table()
+        return pa.concat_tables(tabelas)
+
+    def reservas_por_dia(self, meses=None):
+        """Mesmo resultado do Relatório Diário: [(date, total_reservas)] em ordem de dia."""
+        agrupado = self.reservas(meses).group_by('day_key').aggregate([('id', 'count')]).sort_by('day_key')
+        return [
+            (dia_para_data(dia), total)
+            for dia, total in zip(agrupado['day_key'].to_pylist(), agrupado['id_count'].to_pylist())
+        ]
+
+    def reservas_por_sala(self, meses=None):
+        """[(nome da sala, total_reservas)] do maior para o menor."""
+        agrupado = self.reservas(meses).group_by('room_id').aggregate([('id', 'count')])
+        salas = self.salas().select(['id', 'name'])
+        juntado = agrupado.join(salas, 'room_id', 'id').sort_by([('id_count', 'descending')])
+        return list(zip(juntado['name'].to_pylist(), juntado['id_count'].to_pylist()))
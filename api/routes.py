@@ -0,0 +1,133 @@
+# C:\projetos\sistema de reservas\reservas\api\routes.py
+
+from datetime import datetime, timezone
+from flask import Blueprint, request, jsonify, abort, Response
+from flask_login import login_required, current_user
+
+# Importações Locais
+from ..models import Reserva, Room, RegistroRemovido
+from ..extensions import db
+from ..routing import somente_leitura
+
+# Serialização rápida se o orjson estiver instalado (opcional)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Define o Blueprint da API JSON versionada
+api_bp = Blueprint('api_bp', __name__, url_prefix='/api/v1')
+
+LIMITE_PADRAO = 500
+LIMITE_MAXIMO = 2000
+
+# Campos expostos por recurso; 'id' e 'versao' vão sempre
+CAMPOS_SALA = {
+    'id': Room.id,
+    'versao': Room.versao,
+    'name': Room.name,
+    'description': Room.description,
+    'capacity': Room.capacity,
+    'is_active': Room.is_active,
+}
+CAMPOS_RESERVA = {
+    'id': Reserva.id,
+    'versao': Reserva.versao,
+    'room_id': Reserva.room_id,
+    'user_id': Reserva.user_id,
+    'client_name': Reserva.client_name,
+    'start_time': Reserva.start_time,
+    'end_time': Reserva.end_time,
+    'status': Reserva.status,
+    'created_at': Reserva.created_at,
+    'cancelled_at': Reserva.cancelled_at,
+}
+
+
+def resposta_json(dados):
+    if orjson is not None:
+        return Response(orjson.dumps(dados), mimetype='application/json')
+    return jsonify(dados)
+
+
+def _valor(v):
+    # Datas do SQLite voltam sem fuso; todas estão em UTC
+    if isinstance(v, datetime):
+        return (v if v.tzinfo else v.replace(tzinfo=timezone.utc)).isoformat()
+    return v
+
+
+def _colunas_pedidas(campos_disponiveis):
+    """?campos=id,name -> colunas selecionadas (sempre com id e versao)."""
+    pedidos = request.args.get('campos')
+    if not pedidos:
+        return campos_disponiveis
+    nomes = [nome.strip() for nome in pedidos.split(',') if nome.strip()]
+    desconhecidos = [nome for nome in nomes if nome not in campos_disponiveis]
+    if desconhecidos:
+        abort(400, description=f"Campos desconhecidos: {', '.join(desconhecidos)}")
+    nomes = ['id', 'versao'] + [nome for nome in nomes if nome not in ('id', 'versao')]
+    return {nome: campos_disponiveis[nome] for nome in nomes}
+
+
+def _sincronizar(modelo, campos_disponiveis, *filtros, filtros_removidos=()):
+    """Mudanças com versao > ?desde, em ordem de versão, paginadas por ?limite.
+
+    `filtros_removidos` aplica às lápides o mesmo escopo que `filtros` aplica aos itens.
+    """
+    desde = request.args.get('desde', 0, type=int)
+    limite = min(max(request.args.get('limite', LIMITE_PADRAO, type=int), 1), LIMITE_MAXIMO)
+    colunas = _colunas_pedidas(campos_disponiveis)
+
+    linhas = db.session.execute(
+        db.select(*colunas.values())
+        .where(modelo.versao > desde, *filtros)
+        .order_by(modelo.versao)
+        .limit(limite + 1)
+    ).all()
+    mais = len(linhas) > limite
+    linhas = linhas[:limite]
+
+    # Remoções no mesmo intervalo de versões desta página
+    removidos_query = db.select(RegistroRemovido.registro_id, RegistroRemovido.versao).where(
+        RegistroRemovido.tabela == modelo.__tablename__,
+        RegistroRemovido.versao > desde,
+        *filtros_removidos,
+    )
+    if mais:
+        removidos_query = removidos_query.where(RegistroRemovido.versao <= linhas[-1].versao)
+    removidos = db.session.execute(removidos_query.order_by(RegistroRemovido.versao)).all()
+
+    cursor = max([desde] + [l.versao for l in linhas[-1:]] + [r.versao for r in removidos[-1:]])
+    nomes = list(colunas)
+    return resposta_json({
+        'cursor': cursor,
+        'mais': mais,
+        'itens': [{nome: _valor(v) for nome, v in zip(nomes, linha)} for linha in linhas],
+        'removidos': [r.registro_id for r in removidos],
+    })
+
+
+# ----------------------
+# Salas
+# ----------------------
+@api_bp.route("/salas")
+@login_required
+@somente_leitura
+def sincronizar_salas():
+    return _sincronizar(Room, CAMPOS_SALA)
+
+# ----------------------
+# Reservas (o admin vê todas; o usuário, só as próprias)
+# ----------------------
+@api_bp.route("/reservas")
+@login_required
+@somente_leitura
+def sincronizar_reservas():
+    if current_user.is_admin:
+        return _sincronizar(Reserva, CAMPOS_RESERVA)
+    return _sincronizar(
+        Reserva, CAMPOS_RESERVA, Reserva.user_id == current_user.id,
+        filtros_removidos=[RegistroRemovido.user_id == current_user.id],
+    )
@@ -0,0 +1,166 @@
+import threading
+from datetime import datetime, timezone
+
+# Importações Locais
+from .extensions import db
+from .routing import executar_no_primario
+from .cache import invalidacao
+from .events import barramento, RESERVA_CRIADA, RESERVA_CANCELADA
+from .models import Reserva, para_minuto_epoch, data_para_dia, dia_para_data, MINUTOS_POR_DIA
+
+# ====================================================================
+# DISPONIBILIDADE EM MEMÓRIA
+# Cada sala guarda, por dia, um bytearray com um byte por slot de 15
+# minutos. O byte conta quantas reservas ativas tocam o slot (e não é um
+# simples bit) para que o cancelamento de uma reserva não libere um slot
+# que outra reserva ainda ocupa parcialmente.
+# ====================================================================
+
+SLOT_MINUTOS = 15
+SLOTS_POR_DIA = MINUTOS_POR_DIA // SLOT_MINUTOS
+
+# Reservas que terminaram antes deste intervalo não entram no índice
+HORIZONTE_PASSADO_MINUTOS = MINUTOS_POR_DIA
+
+
+class AgendaSala:
+    """Ocupação de uma sala: day_key -> bytearray(SLOTS_POR_DIA)."""
+
+    __slots__ = ('dias',)
+
+    def __init__(self):
+        self.dias = {}
+
+    @staticmethod
+    def _slots(inicio_minuto, fim_minuto):
+        """Slots absolutos (desde a época) tocados por [inicio_minuto, fim_minuto)."""
+        return range(inicio_minuto // SLOT_MINUTOS, (fim_minuto - 1) // SLOT_MINUTOS + 1)
+
+    def marcar(self, inicio_minuto, fim_minuto, delta=1):
+        for slot in self._slots(inicio_minuto, fim_minuto):
+            dia, indice = divmod(slot, SLOTS_POR_DIA)
+            ocupacao = self.dias.get(dia)
+            if ocupacao is None:
+                if delta < 0:
+                    continue
+                ocupacao = self.dias[dia] = bytearray(SLOTS_POR_DIA)
+            ocupacao[indice] = min(255, max(0, ocupacao[indice] + delta))
+
+    def livre(self, inicio_minuto, fim_minuto):
+        for slot in self._slots(inicio_minuto, fim_minuto):
+            dia, indice = divmod(slot, SLOTS_POR_DIA)
+            ocupacao = self.dias.get(dia)
+            if ocupacao is not None and ocupacao[indice]:
+                return False
+        return True
+
+    def mapa_dia(self, dia):
+        """'0'/'1' por slot do dia ('1' = ocupado)."""
+        ocupacao = self.dias.get(dia)
+        if ocupacao is None:
+            return '0' * SLOTS_POR_DIA
+        return ''.join('1' if n else '0' for n in ocupacao)
+
+
+class IndiceDisponibilidade:
+    """Agendas de todas as salas, montadas numa passada pela tabela de reservas.
+
+    A geração do índice é a maior `versao` de reserva (cursor de sincronização,
+    atribuído a cada escrita) que a montagem já enxergou. Um evento de uma
+    reserva com versão até a geração já está refletido e é ignorado; senão uma
+    reconstrução entre o commit e o publicar_reserva contaria a reserva duas vezes.
+    """
+
+    def __init__(self):
+        self._agendas = None
+        self._geracao = 0
+        self._lock = threading.Lock()
+
+    def construir(self):
+        horizonte = para_minuto_epoch(datetime.now(timezone.utc)) - HORIZONTE_PASSADO_MINUTOS
+        # Geração e reservas no mesmo SELECT (mesmo snapshot): em consultas separadas, um
+        # commit entre as duas entraria nas agendas e ainda seria reaplicado pelo evento.
+        # O LEFT JOIN devolve uma linha com a geração mesmo sem reservas ativas.
+        geracao_sq = db.select(db.func.max(Reserva.versao).label('geracao')).subquery()
+        linhas = executar_no_primario(
+            db.select(geracao_sq.c.geracao, Reserva.room_id, Reserva.start_minute, Reserva.end_minute)
+            .select_from(geracao_sq)
+            .outerjoin(Reserva, db.and_(Reserva.status == 'reserved', Reserva.end_minute > horizonte))
+        ).all()
+        geracao = (linhas[0].geracao if linhas else None) or 0
+        agendas = {}
+        for _geracao, room_id, inicio, fim in linhas:
+            if room_id is None:
+                continue
+            agenda = agendas.get(room_id)
+            if agenda is None:
+                agenda = agendas[room_id] = AgendaSala()
+            agenda.marcar(inicio, fim)
+        self._agendas, self._geracao = agendas, geracao
+        return agendas
+
+    def _obter(self):
+        agendas = self._agendas
+        if agendas is None:
+            with self._lock:
+                agendas = self._agendas
+                if agendas is None:
+                    agendas = self.construir()
+        return agendas
+
+    def invalidar(self):
+        """Descarta o índice; a próxima consulta reconstrói a partir do banco."""
+        with self._lock:
+            self._agendas = None
+
+    # -------------------------
+    # Eventos de reserva (inscritos no barramento, ver final do módulo)
+    # -------------------------
+    def _aplicar(self, reserva, delta):
+        if self._agendas is None or reserva is None:
+            return  # Será montado já com esta alteração (ou foi invalidado)
+        versao = reserva.versao
+        with self._lock:
+            agendas = self._agendas
+            if agendas is None or (versao is not None and versao <= self._geracao):
+                return  # Índice (re)montado depois desta escrita: já a contém
+            agenda = agendas.get(reserva.room_id)
+            if agenda is None:
+                agenda = agendas[reserva.room_id] = AgendaSala()
+            agenda.marcar(reserva.start_minute, reserva.end_minute, delta)
+
+    def reserva_criada(self, reserva):
+        self._aplicar(reserva, 1)
+
+    def reserva_cancelada(self, reserva):
+        self._aplicar(reserva, -1)
+
+    # -------------------------
+    # Consultas
+    # -------------------------
+    def livre(self, room_id, inicio, fim):
+        """Checagem em memória: True se nenhum slot do período estiver ocupado."""
+        agenda = self._obter().get(room_id)
+        if agenda is None:
+            return True
+        return agenda.livre(para_minuto_epoch(inicio), para_minuto_epoch(fim))
+
+    def calendario(self, room_id, primeiro_dia, dias):
+        """Mapa de ocupação da sala para `dias` dias a partir de `primeiro_dia` (date)."""
+        agenda = self._obter().get(room_id) or AgendaSala()
+        inicio = data_para_dia(primeiro_dia)
+        return {
+            'sala_id': room_id,
+            'slot_minutos': SLOT_MINUTOS,
+            'dias': [
+                {'data': dia_para_data(dia).isoformat(), 'ocupado': agenda.mapa_dia(dia)}
+                for dia in range(inicio, inicio + dias)
+            ],
+        }
+
+
+disponibilidade = IndiceDisponibilidade()
+barramento.inscrever(RESERVA_CRIADA, disponibilidade.reserva_criada)
+barramento.inscrever(RESERVA_CANCELADA, disponibilidade.reserva_cancelada)
+# Reservas gravadas por outros workers não passam pelo barramento deste processo
+invalidacao.registrar(Reserva.__tablename__, disponibilidade.invalidar)
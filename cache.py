@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Importações Locais
+from .extensions import db
+from .models import Usuario, Room, Reserva, VersaoCache
+
+# ====================================================================
+# INVALIDAÇÃO DE CACHE ENTRE PROCESSOS
+# Cada worker do gunicorn tem seus próprios caches em memória. Toda escrita
+# em Room/Usuario/Reserva incrementa a versão do namespace (nome da tabela)
+# em cache_versions, na mesma transação. A cada request o worker confere as
+# versões e descarta os caches cujos namespaces mudaram em outro processo.
+#
+# No SQLite a conferência custa um `PRAGMA data_version` numa conexão
+# dedicada: o valor só muda quando outra conexão faz commit, e só então a
+# tabela de versões é lida. Todo cache novo da aplicação deve se registrar
+# aqui com invalidacao.registrar(namespace, funcao_que_descarta).
+# ====================================================================
+
+MODELOS_CACHEADOS = {
+    Usuario: Usuario.__tablename__,
+    Room: Room.__tablename__,
+    Reserva: Reserva.__tablename__,
+}
+
+# Sem SQLite (ou com banco em memória) a tabela é relida no máximo a cada N segundos
+INTERVALO_SEM_SQLITE = 2.0
+
+
+class BarramentoInvalidacao:
+
+    def __init__(self):
+        self._callbacks = {}
+        self._conhecidas = None
+        self._lock = threading.Lock()
+        self._conexao = None
+        self._pid = None
+        self._data_version = None
+        self._proxima_leitura = 0
+
+    def registrar(self, namespace, funcao):
+        """Registra uma função que descarta um cache quando o namespace muda em outro processo."""
+        self._callbacks.setdefault(namespace, []).append(funcao)
+
+    # -------------------------
+    # Escrita: incrementa as versões na transação corrente
+    # -------------------------
+    @staticmethod
+    def marcar(conexao, *namespaces):
+        """Incrementa as versões dos namespaces. Retorna {namespace: nova_versao}."""
+        tabela = VersaoCache.__table__
+        novas = {}
+        for namespace in namespaces:
+            atualizados = conexao.execute(
+                tabela.update().where(tabela.c.namespace == namespace).values(versao=tabela.c.versao + 1)
+            ).rowcount
+            if not atualizados:
+                conexao.execute(tabela.insert().values(namespace=namespace, versao=1))
+            novas[namespace] = conexao.execute(
+                db.select(tabela.c.versao).where(tabela.c.namespace == namespace)
+            ).scalar_one()
+        return novas
+
+    def confirmar_proprias(self, novas, incrementos):
+        """Após o commit local: adota as versões que só este processo mudou (não descarta o próprio cache)."""
+        with self._lock:
+            if self._conhecidas is None:
+                return
+            for namespace, versao in novas.items():
+                if self._conhecidas.get(namespace, 0) == versao - incrementos[namespace]:
+                    self._conhecidas[namespace] = versao
+
+    # -------------------------
+    # Leitura: conferência barata por request
+    # -------------------------
+    def _conexao_sqlite(self):
+        """Conexão própria (somente leitura, sem transação aberta), recriada após fork."""
+        if self._pid != os.getpid():
+            url = db.engine.url
+            if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+                self._conexao = None
+            else:
+                self._conexao = sqlite3.connect(
+                    f'file:{url.database}?mode=ro', uri=True, check_same_thread=False, isolation_level=None
+                )
+            self._pid = os.getpid()
+            self._data_version = None
+        return self._conexao
+
+    def _ler_versoes(self, conexao):
+        if conexao is not None:
+            linhas = conexao.execute('SELECT namespace, versao FROM cache_versions').fetchall()
+        else:
+            with db.engine.connect() as conn:
+                linhas = conn.execute(db.select(VersaoCache.namespace, VersaoCache.versao)).all()
+        return dict(linhas)
+
+    def verificar(self):
+        """Descarta os caches cujos namespaces mudaram desde a última conferência."""
+        if not self._lock.acquire(blocking=False):
+            return  # Outro thread já está conferindo
+        try:
+            conexao = self._conexao_sqlite()
+            if conexao is not None:
+                data_version = conexao.execute('PRAGMA data_version').fetchone()[0]
+                if data_version == self._data_version:
+                    return
+                self._data_version = data_version
+            else:
+                agora = time.monotonic()
+                if agora < self._proxima_leitura:
+                    return
+                self._proxima_leitura = agora + INTERVALO_SEM_SQLITE
+
+            versoes = self._ler_versoes(conexao)
+            anteriores, self._conhecidas = self._conhecidas, versoes
+        finally:
+            self._lock.release()
+
+        if anteriores is None:
+            return  # Primeira leitura: os caches foram montados depois dela
+        for namespace, versao in versoes.items():
+            if anteriores.get(namespace) != versao:
+                for funcao in self._callbacks.get(namespace, ()):
+                    funcao()
+
+
+invalidacao = BarramentoInvalidacao()
+
+
+# -------------------------
+# Hooks da sessão: toda escrita nos modelos cacheados incrementa a versão
+# -------------------------
+@event.listens_for(Session, 'before_flush')
+def _marcar_namespaces(session, flush_context, instances):
+    alterados = list(session.new) + [obj for obj in session.dirty if session.is_modified(obj)] + list(session.deleted)
+    namespaces = {MODELOS_CACHEADOS[type(obj)] for obj in alterados if type(obj) in MODELOS_CACHEADOS}
+    if not namespaces:
+        return
+    novas = invalidacao.marcar(session.connection(), *sorted(namespaces))
+    pendentes = session.info.setdefault('versoes_cache', {})
+    incrementos = session.info.setdefault('incrementos_cache', {})
+    for namespace, versao in novas.items():
+        pendentes[namespace] = versao
+        incrementos[namespace] = incrementos.get(namespace, 0) + 1
+
+
+@event.listens_for(Session, 'after_commit')
+def _confirmar_namespaces(session):
+    novas = session.info.pop('versoes_cache', None)
+    incrementos = session.info.pop('incrementos_cache', None)
+    if novas:
+        invalidacao.confirmar_proprias(novas, incrementos)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_namespaces(session):
+    session.info.pop('versoes_cache', None)
+    session.info.pop('incrementos_cache', None)
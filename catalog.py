@@ -0,0 +1,89 @@
+import threading
+
+# Importações Locais
+from .cache import invalidacao
+from .extensions import db
+from .routing import executar_no_primario
+from .models import Room
+
+# ====================================================================
+# CATÁLOGO DE SALAS
+# As salas mudam poucas vezes por mês, mas toda listagem e todo GET/POST de
+# reserva precisava delas. O catálogo é um snapshot imutável, compartilhado
+# por todos os requests do processo e remontado só quando Room muda: pelas
+# views de admin deste processo (invalidação explícita) ou por outro worker
+# (barramento de invalidação).
+# ====================================================================
+
+class SalaCatalogo:
+    """Cópia somente leitura de uma linha de Room."""
+
+    __slots__ = ('id', 'name', 'description', 'capacity', 'is_active')
+
+    def __init__(self, id, name, description, capacity, is_active):
+        for campo, valor in zip(self.__slots__, (id, name, description, capacity, is_active)):
+            object.__setattr__(self, campo, valor)
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError('SalaCatalogo é imutável')
+
+    def __repr__(self):
+        return f'<SalaCatalogo {self.name}>'
+
+
+class CatalogoSalas:
+    """Snapshot de todas as salas, com os índices usados pelas rotas."""
+
+    __slots__ = ('salas', 'ativas', 'choices', '_por_id')
+
+    def __init__(self, salas):
+        object.__setattr__(self, 'salas', tuple(salas))
+        object.__setattr__(self, 'ativas', tuple(s for s in self.salas if s.is_active))
+        # Pronto para SelectField.choices do ReservaForm
+        object.__setattr__(self, 'choices', tuple((s.id, s.name) for s in self.ativas))
+        object.__setattr__(self, '_por_id', {s.id: s for s in self.salas})
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError('CatalogoSalas é imutável')
+
+    def get(self, sala_id):
+        return self._por_id.get(sala_id)
+
+    def ativa(self, sala_id):
+        """A sala, se existir e estiver ativa (senão None)."""
+        sala = self._por_id.get(sala_id)
+        return sala if sala is not None and sala.is_active else None
+
+
+class CatalogoCompartilhado:
+
+    def __init__(self):
+        self._atual = None
+        self._geracao = 0
+        self._lock = threading.Lock()
+
+    def _montar(self):
+        linhas = executar_no_primario(
+            db.select(Room.id, Room.name, Room.description, Room.capacity, Room.is_active).order_by(Room.id)
+        ).all()
+        return CatalogoSalas(SalaCatalogo(*linha) for linha in linhas)
+
+    def atual(self):
+        catalogo = self._atual
+        if catalogo is None:
+            geracao = self._geracao
+            catalogo = self._montar()
+            with self._lock:
+                # Só publica se ninguém invalidou durante a montagem (senão o snapshot já nasceu velho)
+                if self._geracao == geracao:
+                    self._atual = catalogo
+        return catalogo
+
+    def invalidar(self):
+        with self._lock:
+            self._geracao += 1
+            self._atual = None
+
+
+catalogo_salas = CatalogoCompartilhado()
+invalidacao.registrar(Room.__tablename__, catalogo_salas.invalidar)
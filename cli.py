@@ -1,9 +1,23 @@
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+
+import bcrypt as bcrypt_lib
 import click
+from email_validator import validate_email, EmailNotValidError
+from flask import current_app
 from flask.cli import with_appcontext
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
 
 # Importações Locais
 from .extensions import db, bcrypt
 from .models import Usuario
+from .migrations import atualizar_esquema
+from .cache import invalidacao
+from .analytics import exportar_snapshot, FORMATOS, TAMANHO_LOTE as TAMANHO_LOTE_ANALITICO
 
 @click.command('create-admin')
 @click.argument('username')
@@ -39,6 +53,214 @@ def create_admin(username, email, password):
         db.session.rollback()
         click.echo(f" Erro ao criar administrador: {e}")
 
+# -------------------------
+# Importação em massa de usuários
+# -------------------------
+VALORES_VERDADEIROS = {'1', 'true', 'sim', 's', 'yes', 'y'}
+# O bcrypt só usa os primeiros 72 bytes (e o bcrypt >= 5 recusa senhas maiores)
+MAX_BYTES_SENHA = 72
+
+def _hash_senha(senha, rounds, prefix):
+    """Gera o hash bcrypt de uma senha. Roda nos processos do pool (sem app context).
+
+    Retorna None se o bcrypt recusar a senha, para que uma linha ruim não derrube o lote.
+    """
+    try:
+        salt = bcrypt_lib.gensalt(rounds=rounds, prefix=prefix.encode('utf-8'))
+        return bcrypt_lib.hashpw(senha.encode('utf-8'), salt).decode('utf-8')
+    except ValueError:
+        return None
+
+def _validar_linha(linha):
+    """Normaliza uma linha do CSV. Retorna (dados, erro)."""
+    username = (linha.get('username') or '').strip()
+    email = (linha.get('email') or '').strip()
+    senha = linha.get('password') or ''
+
+    if not 2 <= len(username) <= 20:
+        return None, 'username deve ter entre 2 e 20 caracteres'
+    if not senha:
+        return None, 'senha vazia'
+    if len(senha.encode('utf-8')) > MAX_BYTES_SENHA:
+        return None, f'senha com mais de {MAX_BYTES_SENHA} bytes'
+    try:
+        email = validate_email(email, check_deliverability=False).normalized
+    except EmailNotValidError as e:
+        return None, f'e-mail inválido ({e})'
+    if len(email) > 120:
+        return None, 'e-mail com mais de 120 caracteres'
+
+    is_admin = (linha.get('is_admin') or '').strip().lower() in VALORES_VERDADEIROS
+    return {'username': username, 'email': email, 'password': senha, 'is_admin': is_admin}, None
+
+def _existentes(usernames, emails):
+    """Busca de uma vez só os usernames/e-mails do lote que já estão no banco."""
+    resultado = db.session.execute(
+        db.select(Usuario.username, Usuario.email).where(
+            or_(Usuario.username.in_(usernames), Usuario.email.in_(emails))
+        )
+    ).all()
+    return {r.username for r in resultado}, {r.email for r in resultado}
+
+def _inserir_usuarios(linhas):
+    """INSERT em massa numa transação (levanta IntegrityError sem gravar nada)."""
+    db.session.execute(insert(Usuario), linhas)
+    # INSERT em massa não passa pelos eventos do ORM: avisa os workers manualmente
+    invalidacao.marcar(db.session.connection(), Usuario.__tablename__)
+    db.session.commit()
+
+@click.command('import-users')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=500, show_default=True, help='Linhas por transação.')
+@click.option('--workers', default=None, type=int, help='Processos para o hash das senhas (padrão: nº de CPUs).')
+@click.option('--delimiter', default=',', show_default=True, help='Separador do CSV.')
+@with_appcontext
+def import_users(arquivo, batch_size, workers, delimiter):
+    """Importa usuários de um CSV (colunas: username, email, password[, is_admin])."""
+    rounds = current_app.config.get('BCRYPT_LOG_ROUNDS', 12)
+    prefix = current_app.config.get('BCRYPT_HASH_PREFIX', '2b')
+    workers = workers or os.cpu_count() or 1
+
+    # Usernames/e-mails já vistos neste arquivo (duplicados dentro do próprio CSV)
+    vistos_usernames, vistos_emails = set(), set()
+    lidos = importados = ignorados = 0
+    inicio = time.perf_counter()
+
+    with open(arquivo, newline='', encoding='utf-8-sig') as f, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        leitor = csv.DictReader(f, delimiter=delimiter)
+        faltando = {'username', 'email', 'password'} - set(leitor.fieldnames or [])
+        if faltando:
+            click.echo(f"Erro: colunas obrigatórias ausentes: {', '.join(sorted(faltando))}")
+            return
+
+        while True:
+            lote = list(islice(leitor, batch_size))
+            if not lote:
+                break
+            lidos += len(lote)
+
+            # 1. Validação e deduplicação dentro do arquivo: [(número da linha, dados)]
+            validos = []
+            for numero, linha in enumerate(lote, start=lidos - len(lote) + 2):
+                dados, erro = _validar_linha(linha)
+                if erro is None and (dados['username'] in vistos_usernames or dados['email'] in vistos_emails):
+                    erro = 'duplicado no arquivo'
+                if erro:
+                    click.echo(f"Linha {numero}: ignorada ({erro}).")
+                    ignorados += 1
+                    continue
+                vistos_usernames.add(dados['username'])
+                vistos_emails.add(dados['email'])
+                validos.append((numero, dados))
+
+            if not validos:
+                continue
+
+            # 2. Unicidade contra o banco: uma consulta por lote
+            usernames_bd, emails_bd = _existentes(
+                [d['username'] for _, d in validos], [d['email'] for _, d in validos]
+            )
+            novos = []
+            for numero, dados in validos:
+                if dados['username'] in usernames_bd or dados['email'] in emails_bd:
+                    campo = 'username' if dados['username'] in usernames_bd else 'e-mail'
+                    click.echo(f"Linha {numero}: ignorada ({campo} já cadastrado).")
+                    ignorados += 1
+                else:
+                    novos.append((numero, dados))
+
+            if not novos:
+                continue
+
+            # 3. Hash das senhas em paralelo
+            hashes = pool.map(
+                _hash_senha,
+                [d['password'] for _, d in novos],
+                repeat(rounds),
+                repeat(prefix),
+                chunksize=max(1, len(novos) // (workers * 4)),
+            )
+            com_hash = []
+            for (numero, dados), hashed in zip(novos, hashes):
+                if hashed is None:
+                    click.echo(f"Linha {numero}: ignorada (senha recusada pelo bcrypt).")
+                    ignorados += 1
+                    continue
+                dados['password'] = hashed
+                com_hash.append((numero, dados))
+            novos = com_hash
+
+            if not novos:
+                continue
+
+            # 4. Inserção do lote numa única transação
+            try:
+                _inserir_usuarios([d for _, d in novos])
+                importados += len(novos)
+            except IntegrityError:
+                # Alguém gravou no meio do caminho (outro import, um cadastro): refaz linha a linha
+                db.session.rollback()
+                for numero, dados in novos:
+                    try:
+                        _inserir_usuarios([dados])
+                        importados += 1
+                    except IntegrityError as e:
+                        db.session.rollback()
+                        ignorados += 1
+                        click.echo(f"Linha {numero}: ignorada ({e.orig}).")
+
+            decorrido = time.perf_counter() - inicio
+            click.echo(f" {lidos} linhas lidas, {importados} importadas ({lidos / decorrido:.1f} linhas/s)")
+
+    decorrido = time.perf_counter() - inicio
+    click.echo(
+        f" Importação concluída: {importados} usuários criados, {ignorados} ignorados, "
+        f"{lidos} linhas em {decorrido:.1f}s ({lidos / decorrido if decorrido else 0:.1f} linhas/s)."
+    )
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db():
+    """Aplica as migrações de esquema pendentes (colunas novas, índices e backfill).
+
+    Com AUTO_MIGRATE ligado (padrão) elas já rodaram ao carregar o app; o comando
+    mostra o que foi aplicado. Com AUTO_MIGRATE=0 é ele quem migra.
+    """
+    resumo = current_app.extensions.pop('migracao_inicial', None)
+    if resumo is None:
+        resumo = atualizar_esquema()
+    else:
+        click.echo(" Migrações aplicadas ao carregar a aplicação:")
+    for tabela, colunas in resumo.items():
+        if isinstance(colunas, list) and colunas:
+            click.echo(f" {tabela}: colunas adicionadas: {', '.join(colunas)}")
+    click.echo(
+        f" Migração concluída ({resumo['reservas_preenchidas']} reservas e "
+        f"{resumo['versoes_preenchidas']} versões preenchidas)."
+    )
+
+@click.command('export-analytics')
+@click.argument('destino', required=False)
+@click.option('--formato', type=click.Choice(FORMATOS), default='arrow', show_default=True,
+              help='arrow (IPC, leitura por memory-map) ou parquet.')
+@click.option('--batch-size', default=TAMANHO_LOTE_ANALITICO, show_default=True, help='Linhas por lote gravado.')
+@click.option('--manter', default=None, type=int, help='Quantos snapshots manter (apaga os mais antigos).')
+@with_appcontext
+def export_analytics(destino, formato, batch_size, manter):
+    """Exporta reservas, salas e usuários para um snapshot colunar (Arrow/Parquet)."""
+    destino = destino or current_app.config['ANALYTICS_DIR']
+    try:
+        diretorio, contagens = exportar_snapshot(destino, formato, batch_size, manter)
+    except RuntimeError as e:
+        click.echo(f"Erro: {e}")
+        return
+    resumo = ', '.join(f"{total} {tabela}" for tabela, total in contagens.items())
+    click.echo(f" Snapshot gravado em {diretorio} ({resumo}).")
+
 def init_cli(app):
     """Registra comandos CLI no aplicativo Flask."""
-    app.cli.add_command(create_admin)
\ No newline at end of file
+    app.cli.add_command(create_admin)
+    app.cli.add_command(import_users)
+    app.cli.add_command(upgrade_db)
+    app.cli.add_command(export_analytics)
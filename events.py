@@ -0,0 +1,283 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+# Importações Locais
+from .cache import invalidacao
+from .extensions import db
+from .models import Reserva, EventoReserva, para_minuto_epoch
+
+# ====================================================================
+# BARRAMENTO DE EVENTOS
+# As rotas publicam as mudanças de ocupação das salas para os ouvintes do
+# processo (o índice de disponibilidade). Os streams SSE, por sua vez, só
+# recebem o que está gravado em eventos_reserva: o id de cada evento é o id
+# da tabela, o mesmo em todos os workers, e um EventSource que reconecta em
+# outro worker retoma do seu Last-Event-ID sem repetir nem perder eventos.
+# Os eventos recentes ficam num buffer circular; os mais antigos são lidos
+# da tabela.
+# ====================================================================
+
+RESERVA_CRIADA = 'reserva_criada'
+RESERVA_CANCELADA = 'reserva_cancelada'
+RESERVA_ALTERADA = 'reserva_alterada'
+SESSAO_INICIADA = 'sessao_iniciada'
+SESSAO_ENCERRADA = 'sessao_encerrada'
+RECARREGAR = 'recarregar'
+
+
+class Evento:
+    __slots__ = ('id', 'tipo', 'dados')
+
+    def __init__(self, id, tipo, dados):
+        self.id = id
+        self.tipo = tipo
+        self.dados = dados
+
+    def sse(self):
+        """Formato text/event-stream."""
+        return f"id: {self.id}\nevent: {self.tipo}\ndata: {json.dumps(self.dados)}\n\n"
+
+
+class BarramentoEventos:
+    """Avisa ouvintes síncronos e guarda, para os streams bloqueados em wait(), os eventos lidos da tabela."""
+
+    def __init__(self, tamanho_buffer=1000):
+        self._buffer = deque(maxlen=tamanho_buffer)
+        self._ultimo_id = 0
+        self._condicao = threading.Condition()
+        self._ouvintes = {}
+
+    def inscrever(self, tipo, funcao):
+        """Registra uma função chamada (no mesmo thread) a cada evento do tipo."""
+        self._ouvintes.setdefault(tipo, []).append(funcao)
+
+    def publicar(self, tipo, objeto=None):
+        """Avisa os ouvintes deste processo; o evento chega aos streams pela tabela."""
+        for funcao in self._ouvintes.get(tipo, ()):
+            funcao(objeto)
+
+    def anexar(self, eventos):
+        """Acrescenta ao buffer eventos já em ordem de id e acorda os streams."""
+        with self._condicao:
+            for evento in eventos:
+                if evento.id > self._ultimo_id:
+                    self._buffer.append(evento)
+                    self._ultimo_id = evento.id
+            self._condicao.notify_all()
+
+    def posicionar(self, ultimo_id):
+        """Define o ponto de partida do buffer (o fim da tabela na criação do app)."""
+        with self._condicao:
+            self._buffer.clear()
+            self._ultimo_id = ultimo_id
+
+    @property
+    def ultimo_id(self):
+        return self._ultimo_id
+
+    def perdeu_eventos(self, ultimo_id):
+        """True se o cliente está atrás do que o buffer ainda guarda."""
+        with self._condicao:
+            inicio = self._buffer[0].id - 1 if self._buffer else self._ultimo_id
+            return ultimo_id < inicio
+
+    def desde(self, ultimo_id):
+        """Eventos com id > ultimo_id ainda no buffer."""
+        with self._condicao:
+            return [e for e in self._buffer if e.id > ultimo_id]
+
+    def aguardar(self, ultimo_id, timeout):
+        """Bloqueia até haver evento novo ou estourar o timeout. Não consome CPU enquanto espera."""
+        with self._condicao:
+            if self._ultimo_id <= ultimo_id:
+                self._condicao.wait(timeout)
+            return [e for e in self._buffer if e.id > ultimo_id]
+
+
+barramento = BarramentoEventos()
+
+
+def dados_reserva(reserva):
+    """Dados de uma reserva enviados ao stream."""
+    return {
+        'reserva_id': reserva.id,
+        'sala_id': reserva.room_id,
+        'inicio': reserva.start_time.replace(tzinfo=timezone.utc).isoformat(),
+        'fim': reserva.end_time.replace(tzinfo=timezone.utc).isoformat(),
+    }
+
+def publicar_reserva(tipo, reserva):
+    """Publica a criação/cancelamento de uma reserva já confirmada no banco."""
+    barramento.publicar(tipo, reserva)
+    # O evento já está em eventos_reserva (gravado no flush): leva-o aos streams deste processo
+    leitor_eventos.sincronizar()
+
+
+# -------------------------
+# Início/fim de sessões
+# Não há escrita de reserva quando uma sessão começa ou termina; um único
+# verificador por processo (e não um por conexão) consulta as fronteiras
+# que passaram desde a última checagem e grava as transições em
+# eventos_reserva. A chave única faz com que cada transição seja gravada
+# uma vez só, qualquer que seja o worker que a veja primeiro.
+# -------------------------
+class VerificadorSessoes:
+
+    def __init__(self, intervalo=15):
+        self.intervalo = intervalo
+        self._ultimo_minuto = None
+        self._proxima_checagem = 0
+        self._lock = threading.Lock()
+
+    def verificar(self):
+        agora = time.monotonic()
+        if agora < self._proxima_checagem or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._proxima_checagem = agora + self.intervalo
+            minuto = para_minuto_epoch(datetime.now(timezone.utc))
+            anterior = self._ultimo_minuto
+            self._ultimo_minuto = minuto
+            if anterior is None or minuto <= anterior:
+                return
+
+            # (anterior, minuto]: reservas ativas que começaram ou terminaram nesse intervalo.
+            # Conexão própria e curta: o stream SSE fica aberto e não deve segurar transação.
+            with db.engine.connect() as conn:
+                linhas = conn.execute(
+                    db.select(Reserva.id, Reserva.room_id, Reserva.start_minute, Reserva.end_minute).where(
+                        Reserva.status == 'reserved',
+                        Reserva.end_minute > anterior,
+                        Reserva.start_minute <= minuto,
+                    )
+                ).all()
+            eventos = []
+            for linha in sorted(linhas, key=lambda l: l.start_minute):
+                if anterior < linha.start_minute <= minuto:
+                    eventos.append(_linha_sessao(SESSAO_INICIADA, linha, linha.start_minute))
+                if anterior < linha.end_minute <= minuto:
+                    eventos.append(_linha_sessao(SESSAO_ENCERRADA, linha, linha.end_minute))
+            if not eventos:
+                return
+
+            with db.engine.begin() as conn:
+                gravados = conn.execute(EventoReserva.__table__.insert().prefix_with('OR IGNORE'), eventos).rowcount
+                if gravados:
+                    invalidacao.marcar(conn, EventoReserva.__tablename__)
+            leitor_eventos.sincronizar()
+        finally:
+            self._lock.release()
+
+
+def _linha_sessao(tipo, linha, minuto):
+    return {
+        'origem': os.getpid(),
+        'tipo': tipo,
+        'dados': json.dumps({'reserva_id': linha.id, 'sala_id': linha.room_id}),
+        'chave': f'{tipo}:{linha.id}:{minuto}',
+    }
+
+
+verificador_sessoes = VerificadorSessoes()
+
+
+# -------------------------
+# Eventos entre processos
+# Todo flush que cria, cancela ou altera reservas grava também o evento
+# concreto em eventos_reserva, na mesma transação. Cada worker lê a tabela
+# logo após as próprias escritas e quando o PRAGMA data_version acusa a
+# escrita de outro (ver cache.py), e a repassa aos seus streams na ordem
+# dos ids, sem obrigar os painéis a recarregar.
+# -------------------------
+# Eventos mantidos na tabela (o suficiente para um worker atrasado alcançar)
+RETENCAO_EVENTOS = 10000
+LIMPEZA_EVENTOS_A_CADA = 1000
+
+_eventos_gravados = 0
+
+def _tipo_evento(session, reserva):
+    """Mesma classificação das views de admin: criada, cancelada ou alterada."""
+    if reserva in session.new:
+        return RESERVA_CRIADA
+    if reserva in session.deleted:
+        return RESERVA_CANCELADA
+    if inspect(reserva).attrs.status.history.has_changes() and reserva.status != 'reserved':
+        return RESERVA_CANCELADA
+    return RESERVA_ALTERADA
+
+
+@event.listens_for(Session, 'after_flush')
+def _gravar_eventos(session, flush_context):
+    global _eventos_gravados
+    reservas = [
+        obj for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, Reserva) and (obj in session.new or obj in session.deleted or session.is_modified(obj))
+    ]
+    if not reservas:
+        return
+
+    conexao = session.connection()
+    conexao.execute(EventoReserva.__table__.insert(), [
+        {'origem': os.getpid(), 'tipo': _tipo_evento(session, r), 'dados': json.dumps(dados_reserva(r))}
+        for r in reservas
+    ])
+    _eventos_gravados += len(reservas)
+    if _eventos_gravados >= LIMPEZA_EVENTOS_A_CADA:
+        _eventos_gravados = 0
+        tabela = EventoReserva.__table__
+        limite = db.select(func.max(tabela.c.id) - RETENCAO_EVENTOS).scalar_subquery()
+        conexao.execute(tabela.delete().where(tabela.c.id < limite))
+
+
+class LeitorEventos:
+    """Leva ao buffer dos streams deste processo os eventos gravados em eventos_reserva, por qualquer worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def _ler(self, desde_id, ate_id=None):
+        consulta = (
+            db.select(EventoReserva.id, EventoReserva.tipo, EventoReserva.dados)
+            .where(EventoReserva.id > desde_id).order_by(EventoReserva.id)
+        )
+        if ate_id is not None:
+            consulta = consulta.where(EventoReserva.id <= ate_id)
+        with db.engine.connect() as conn:
+            return [Evento(l.id, l.tipo, json.loads(l.dados)) for l in conn.execute(consulta)]
+
+    def iniciar(self):
+        """Começa do fim da tabela: o histórico anterior não é reenviado aos streams."""
+        with db.engine.connect() as conn:
+            ultimo_id = conn.execute(db.select(func.max(EventoReserva.id))).scalar() or 0
+        barramento.posicionar(ultimo_id)
+
+    def sincronizar(self):
+        """Chamado após gravar um evento aqui ou quando outro processo escreveu na tabela."""
+        with self._lock:
+            desde_id = barramento.ultimo_id
+            eventos = self._ler(desde_id)
+            if not eventos:
+                return
+            if desde_id and eventos[0].id > desde_id + 1:
+                # Buraco na sequência: eventos já apagados pela retenção; os clientes recarregam
+                eventos.insert(0, Evento(eventos[0].id - 1, RECARREGAR, {}))
+            barramento.anexar(eventos)
+
+    def historico(self, desde_id):
+        """Eventos com id > desde_id que já saíram do buffer, ou None se a tabela também não os tem mais."""
+        eventos = self._ler(desde_id, ate_id=barramento.ultimo_id)
+        if eventos and eventos[0].id != desde_id + 1:
+            return None
+        return eventos
+
+
+leitor_eventos = LeitorEventos()
+invalidacao.registrar(Reserva.__tablename__, leitor_eventos.sincronizar)
+invalidacao.registrar(EventoReserva.__tablename__, leitor_eventos.sincronizar)
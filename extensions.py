@@ -2,6 +2,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
 from flask_admin import Admin
+from .routing import RoutingSession
 
 # ====================================================================
 # INSTÂNCIAS GLOBAIS
@@ -9,7 +10,7 @@ from flask_admin import Admin
 # evitando a importação circular.
 # ====================================================================
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession}) # Leituras/escritas roteadas (ver routing.py)
 login_manager = LoginManager()
 admin = Admin(name='Painel Executivo')
 bcrypt = Bcrypt()
\ No newline at end of file
@@ -1,10 +1,12 @@
 # Importações
 from datetime import datetime
+from flask import current_app
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField, BooleanField, SelectField, DateTimeField, IntegerField # <-- ADICIONADO IntegerField
 from wtforms.validators import DataRequired, Length, Email, EqualTo, ValidationError, NumberRange # <-- ADICIONADO NumberRange
-from .models import Usuario, Reserva, Room
+from .models import Usuario, Reserva
 from .extensions import db
+from .uniqueness import unicidade, campos_violados
 
 # Para validação de email
 from email_validator import validate_email, EmailNotValidError
@@ -19,15 +21,34 @@ class RegistrationForm(FlaskForm):
     confirm_password = PasswordField('Confirmar Senha', validators=[DataRequired(), EqualTo('password')])
     submit = SubmitField('Cadastrar')
 
-    def validate_username(self, username):
-        user = Usuario.query.filter_by(username=username.data).first()
-        if user:
-            raise ValidationError('Este nome de usuário já está em uso. Escolha outro.')
+    MENSAGENS_UNICIDADE = {
+        'username': 'Este nome de usuário já está em uso. Escolha outro.',
+        'email': 'Este e-mail já está cadastrado. Faça o login ou use outro e-mail.',
+    }
 
-    def validate_email(self, email):
-        user = Usuario.query.filter_by(email=email.data).first()
-        if user:
-            raise ValidationError('Este e-mail já está cadastrado. Faça o login ou use outro e-mail.')
+    def validate(self, extra_validators=None):
+        valido = super().validate(extra_validators)
+
+        # Sob carga (UNIQUENESS_PRECHECK=0) a checagem fica só com a constraint do banco,
+        # e o IntegrityError é devolvido no formulário por aplicar_erro_unicidade()
+        if not current_app.config.get('UNIQUENESS_PRECHECK', True):
+            return valido
+
+        if self.username.errors or self.email.errors:
+            return False
+
+        # Uma única consulta para username e e-mail (e nenhuma se o filtro garantir que são novos)
+        conflitos = unicidade.conflitos_usuario(self.username.data, self.email.data)
+        for campo in conflitos:
+            self[campo].errors.append(self.MENSAGENS_UNICIDADE[campo])
+        return valido and not conflitos
+
+    def aplicar_erro_unicidade(self, erro):
+        """Mapeia a violação de UNIQUE do banco para os mesmos erros das pré-checagens."""
+        campos = campos_violados(erro, Usuario.__tablename__, self.MENSAGENS_UNICIDADE)
+        for campo in campos:
+            self[campo].errors.append(self.MENSAGENS_UNICIDADE[campo])
+        return bool(campos)
 
 # ======================
 # Formulário de Login
@@ -41,6 +62,9 @@ class LoginForm(FlaskForm):
 # ======================
 # Formulário de Reserva
 # ======================
+# Durações aceitas (em horas), também usadas pela checagem de disponibilidade
+DURACOES_HORAS = range(1, 5)
+
 class ReservaForm(FlaskForm):
     # Campo para selecionar a sala dinamicamente do banco
     sala = SelectField('Sala de Reunião', coerce=int, validators=[DataRequired()])
@@ -50,7 +74,7 @@ class ReservaForm(FlaskForm):
 
     # Duração em horas (1 a 4 horas)
     duracao = SelectField('Duração (horas)',
-                          choices=[(str(i), f'{i} hora(s)') for i in range(1, 5)],
+                          choices=[(str(i), f'{i} hora(s)') for i in DURACOES_HORAS],
                           validators=[DataRequired()])
 
     submit = SubmitField('Fazer Reserva')
@@ -73,16 +97,9 @@ class RoomForm(FlaskForm):
     def validate_name(self, name):
         # O self.room_id será definido no main.py se estivermos editando
         room_id = getattr(self, 'room_id', None)
-        
-        query = Room.query.filter_by(name=name.data)
-        
-        if room_id:
-            # Exclui a sala atual da checagem de unicidade
-            query = query.filter(Room.id != room_id)
-            
-        existing_room = query.first()
-        
-        if existing_room:
+
+        # Exclui a sala atual da checagem de unicidade
+        if unicidade.nome_sala_em_uso(name.data, ignorar_id=room_id):
             raise ValidationError('Já existe uma sala com este nome. Escolha um nome diferente.')
 
 
@@ -0,0 +1,96 @@
+from sqlalchemy import inspect, text, bindparam
+
+# Importações Locais
+from .extensions import db
+from .models import Reserva, Room, RegistroRemovido, EventoReserva, para_minuto_epoch, proximas_versoes, MINUTOS_POR_DIA
+
+# ====================================================================
+# MIGRAÇÕES DE ESQUEMA
+# O projeto não usa Alembic: db.create_all() cria tabelas novas, mas não
+# altera as existentes. Estas funções são idempotentes e rodam na criação
+# do app (e pelo comando `flask upgrade-db`).
+# ====================================================================
+
+TAMANHO_LOTE = 1000
+
+def _adicionar_colunas(tabela, colunas):
+    """ALTER TABLE ADD COLUMN para as colunas que ainda não existem."""
+    existentes = {c['name'] for c in inspect(db.engine).get_columns(tabela)}
+    adicionadas = []
+    with db.engine.begin() as conn:
+        for nome, tipo in colunas:
+            if nome not in existentes:
+                conn.execute(text(f'ALTER TABLE {tabela} ADD COLUMN {nome} {tipo}'))
+                adicionadas.append(nome)
+    return adicionadas
+
+def _criar_indices(tabela_modelo):
+    with db.engine.begin() as conn:
+        for indice in tabela_modelo.indexes:
+            indice.create(conn, checkfirst=True)
+
+def preencher_minutos_reservas():
+    """Backfill de start_minute/end_minute/day_key nas reservas antigas, em lotes."""
+    tabela = Reserva.__table__
+    atualizar = tabela.update().where(tabela.c.id == bindparam('b_id')).values(
+        start_minute=bindparam('b_start'),
+        end_minute=bindparam('b_end'),
+        day_key=bindparam('b_day'),
+    )
+    total = 0
+    while True:
+        with db.engine.begin() as conn:
+            linhas = conn.execute(
+                db.select(tabela.c.id, tabela.c.start_time, tabela.c.end_time)
+                .where(tabela.c.start_minute.is_(None))
+                .limit(TAMANHO_LOTE)
+            ).all()
+            if not linhas:
+                return total
+            parametros = []
+            for linha in linhas:
+                inicio = para_minuto_epoch(linha.start_time)
+                parametros.append({
+                    'b_id': linha.id,
+                    'b_start': inicio,
+                    'b_end': para_minuto_epoch(linha.end_time),
+                    'b_day': inicio // MINUTOS_POR_DIA,
+                })
+            conn.execute(atualizar, parametros)
+            total += len(linhas)
+
+def preencher_versoes(modelo):
+    """Dá uma versão de sincronização às linhas que ainda não têm (em ordem de id)."""
+    tabela = modelo.__table__
+    atualizar = tabela.update().where(tabela.c.id == bindparam('b_id')).values(versao=bindparam('b_versao'))
+    total = 0
+    while True:
+        with db.engine.begin() as conn:
+            ids = conn.execute(
+                db.select(tabela.c.id).where(tabela.c.versao.is_(None)).order_by(tabela.c.id).limit(TAMANHO_LOTE)
+            ).scalars().all()
+            if not ids:
+                return total
+            versoes = proximas_versoes(conn, len(ids))
+            conn.execute(atualizar, [{'b_id': i, 'b_versao': v} for i, v in zip(ids, versoes)])
+            total += len(ids)
+
+def atualizar_esquema():
+    """Aplica todas as migrações pendentes. Retorna um resumo do que foi feito."""
+    resumo = {}
+    resumo['reservations'] = _adicionar_colunas('reservations', [
+        ('start_minute', 'INTEGER'),
+        ('end_minute', 'INTEGER'),
+        ('day_key', 'INTEGER'),
+    ])
+    resumo['reservations'] += _adicionar_colunas('reservations', [('versao', 'INTEGER')])
+    resumo['rooms'] = _adicionar_colunas('rooms', [('versao', 'INTEGER')])
+    resumo['sync_removidos'] = _adicionar_colunas('sync_removidos', [('user_id', 'INTEGER')])
+    resumo['eventos_reserva'] = _adicionar_colunas('eventos_reserva', [('chave', 'VARCHAR(80)')])
+    _criar_indices(Reserva.__table__)
+    _criar_indices(Room.__table__)
+    _criar_indices(RegistroRemovido.__table__)
+    _criar_indices(EventoReserva.__table__)
+    resumo['reservas_preenchidas'] = preencher_minutos_reservas()
+    resumo['versoes_preenchidas'] = preencher_versoes(Room) + preencher_versoes(Reserva)
+    return resumo
@@ -1,6 +1,8 @@
 from .extensions import db, login_manager
 from flask_login import UserMixin
-from datetime import datetime, timezone 
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone, timedelta, date
 
 # -------------------------
 # Função para default de data/hora (Timezone-aware)
@@ -9,6 +11,32 @@ def get_utc_now():
     """Retorna o datetime.now(timezone.utc) para evitar warnings e garantir consistência."""
     return datetime.now(timezone.utc)
 
+# -------------------------
+# Tempo em minutos desde a época (UTC)
+# -------------------------
+MINUTOS_POR_DIA = 24 * 60
+EPOCA = date(1970, 1, 1)
+
+def para_minuto_epoch(dt):
+    """Converte um datetime em minutos desde 1970-01-01 UTC. Datetimes sem fuso são tratados como UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp()) // 60
+
+def de_minuto_epoch(minuto):
+    """Inverso de para_minuto_epoch (datetime com fuso UTC)."""
+    return datetime.fromtimestamp(minuto * 60, timezone.utc)
+
+def dia_para_data(day_key):
+    """Converte a chave de dia (dias desde a época) em date."""
+    return EPOCA + timedelta(days=day_key)
+
+def data_para_dia(d):
+    """Converte um date/datetime na chave de dia (dias desde a época)."""
+    if isinstance(d, datetime):
+        return para_minuto_epoch(d) // MINUTOS_POR_DIA
+    return (d - EPOCA).days
+
 # -------------------------
 # Usuário
 # -------------------------
@@ -38,6 +66,8 @@ class Room(db.Model):
     description = db.Column(db.String(200))
     capacity = db.Column(db.Integer, nullable=False)
     is_active = db.Column(db.Boolean, default=True)
+    # Cursor de sincronização (ver SequenciaSync)
+    versao = db.Column(db.Integer, index=True)
 
     reservations = db.relationship('Reserva', backref='room', lazy=True)
 
@@ -54,17 +84,168 @@ class Reserva(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
     client_name = db.Column(db.String(100), nullable=False)
     
-    # Esta coluna é usada para o relatório!
     start_time = db.Column(db.DateTime, nullable=False)
     end_time = db.Column(db.DateTime, nullable=False)
+
+    # Mesmo horário em minutos desde a época (UTC) + dia, mantidos pelos eventos abaixo.
+    # Conflito, ocupação e relatório consultam só estas colunas (varreduras de intervalo inteiro).
+    start_minute = db.Column(db.Integer)
+    end_minute = db.Column(db.Integer)
+    day_key = db.Column(db.Integer)
+    # Cursor de sincronização (ver SequenciaSync)
+    versao = db.Column(db.Integer)
     
     status = db.Column(db.String(20), default='reserved')
     created_at = db.Column(db.DateTime, default=get_utc_now)
     cancelled_at = db.Column(db.DateTime, nullable=True)
 
+    __table_args__ = (
+        # Conflito de uma sala: só reservas que ainda não terminaram
+        db.Index('ix_reservations_room_status_end', 'room_id', 'status', 'end_minute'),
+        # Ocupação de todas as salas agora
+        db.Index('ix_reservations_status_end', 'status', 'end_minute'),
+        # Minhas reservas (ordenadas por início)
+        db.Index('ix_reservations_user_start', 'user_id', 'start_minute'),
+        # Relatório diário
+        db.Index('ix_reservations_day_key', 'day_key'),
+        # Sincronização (API): todas as mudanças e as de um usuário
+        db.Index('ix_reservations_versao', 'versao'),
+        db.Index('ix_reservations_user_versao', 'user_id', 'versao'),
+    )
+
     def __repr__(self):
         return f"<Reserva {self.client_name} - Room {self.room_id}>"
 
+    def sincronizar_minutos(self):
+        """Recalcula start_minute/end_minute/day_key a partir de start_time/end_time."""
+        if self.start_time is not None:
+            self.start_minute = para_minuto_epoch(self.start_time)
+            self.day_key = self.start_minute // MINUTOS_POR_DIA
+        if self.end_time is not None:
+            self.end_minute = para_minuto_epoch(self.end_time)
+
+    @classmethod
+    def ativas_entre(cls, inicio_minuto, fim_minuto):
+        """Filtro das reservas ativas que se sobrepõem a [inicio_minuto, fim_minuto)."""
+        return db.and_(
+            cls.status == 'reserved',
+            cls.end_minute > inicio_minuto,
+            cls.start_minute < fim_minuto,
+        )
+
+    @classmethod
+    def ativas_em(cls, minuto):
+        """Filtro das reservas ativas em andamento no minuto informado."""
+        return cls.ativas_entre(minuto, minuto + 1)
+
+    @classmethod
+    def conflito(cls, room_id, inicio, fim):
+        """Primeira reserva ativa da sala que se sobrepõe ao período (ou None)."""
+        return cls.query.filter(
+            cls.room_id == room_id,
+            cls.ativas_entre(para_minuto_epoch(inicio), para_minuto_epoch(fim)),
+        ).first()
+
+    @classmethod
+    def salas_ocupadas(cls, momento):
+        """Conjunto de room_id com sessão em andamento no momento informado."""
+        minuto = para_minuto_epoch(momento)
+        linhas = db.session.execute(
+            db.select(cls.room_id).where(cls.ativas_em(minuto)).distinct()
+        ).scalars()
+        return set(linhas)
+
+
+@event.listens_for(Reserva, 'before_insert')
+@event.listens_for(Reserva, 'before_update')
+def _sincronizar_minutos(mapper, connection, target):
+    target.sincronizar_minutos()
+
+# -------------------------
+# Sincronização incremental
+# -------------------------
+class SequenciaSync(db.Model):
+    """Contador monotônico compartilhado; cada escrita em Room/Reserva recebe o próximo valor em `versao`."""
+    __tablename__ = 'sync_sequencia'
+    nome = db.Column(db.String(20), primary_key=True)
+    valor = db.Column(db.Integer, nullable=False, default=0)
+
+
+class RegistroRemovido(db.Model):
+    """Lápide de um registro apagado, para que os clientes também recebam as remoções."""
+    __tablename__ = 'sync_removidos'
+    id = db.Column(db.Integer, primary_key=True)
+    tabela = db.Column(db.String(50), nullable=False)
+    registro_id = db.Column(db.Integer, nullable=False)
+    versao = db.Column(db.Integer, nullable=False)
+    # Dono do registro (reservas): a API só entrega a lápide a ele e aos admins
+    user_id = db.Column(db.Integer, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_sync_removidos_tabela_versao', 'tabela', 'versao'),
+        db.Index('ix_sync_removidos_tabela_user_versao', 'tabela', 'user_id', 'versao'),
+    )
+
+
+MODELOS_SINCRONIZADOS = (Room, Reserva)
+SEQUENCIA_GLOBAL = 'global'
+
+def proximas_versoes(conexao, quantidade):
+    """Reserva `quantidade` valores da sequência. O UPDATE trava a escrita até o commit,
+    então a ordem das versões acompanha a ordem dos commits."""
+    tabela = SequenciaSync.__table__
+    atualizados = conexao.execute(
+        tabela.update().where(tabela.c.nome == SEQUENCIA_GLOBAL).values(valor=tabela.c.valor + quantidade)
+    ).rowcount
+    if not atualizados:
+        conexao.execute(tabela.insert().values(nome=SEQUENCIA_GLOBAL, valor=quantidade))
+    fim = conexao.execute(db.select(tabela.c.valor).where(tabela.c.nome == SEQUENCIA_GLOBAL)).scalar_one()
+    return range(fim - quantidade + 1, fim + 1)
+
+
+@event.listens_for(Session, 'before_flush')
+def _carimbar_versoes(session, flush_context, instances):
+    alterados = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, MODELOS_SINCRONIZADOS) and session.is_modified(obj)
+    ]
+    removidos = [obj for obj in session.deleted if isinstance(obj, MODELOS_SINCRONIZADOS)]
+    if not alterados and not removidos:
+        return
+
+    versoes = iter(proximas_versoes(session.connection(), len(alterados) + len(removidos)))
+    for obj in alterados:
+        obj.versao = next(versoes)
+    for obj in removidos:
+        session.add(RegistroRemovido(
+            tabela=obj.__tablename__, registro_id=obj.id, versao=next(versoes),
+            user_id=getattr(obj, 'user_id', None),
+        ))
+
+# -------------------------
+# Versões de cache (invalidação entre processos, ver cache.py)
+# -------------------------
+class VersaoCache(db.Model):
+    __tablename__ = 'cache_versions'
+    namespace = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+
+# -------------------------
+# Eventos de reserva entre processos (ver events.py)
+# -------------------------
+class EventoReserva(db.Model):
+    """Evento dos streams de salas; o id é o id SSE, comum a todos os workers."""
+    __tablename__ = 'eventos_reserva'
+    id = db.Column(db.Integer, primary_key=True)
+    origem = db.Column(db.Integer, nullable=False)  # pid do worker que gravou
+    tipo = db.Column(db.String(30), nullable=False)
+    dados = db.Column(db.Text, nullable=False)      # JSON enviado ao stream
+    chave = db.Column(db.String(80))                # Início/fim de sessão: gravado por um worker só
+
+    __table_args__ = (
+        db.Index('ix_eventos_reserva_chave', 'chave', unique=True),
+    )
+
 # -------------------------
 # Flask-Login
 # -------------------------
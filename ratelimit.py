@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from flask import request, session, current_app, Response, g
+
+# ====================================================================
+# LIMITE DE REQUISIÇÕES (token bucket)
+# Roda antes de qualquer bcrypt ou ORM: só usa o IP, o _user_id que o
+# Flask-Login guarda na sessão, a conta digitada no formulário de login e
+# um SQLite próprio (instance/ratelimit.db)
+# compartilhado pelos workers. Cada checagem é um único UPSERT atômico; e
+# uma chave negada fica negada localmente até o próximo token, então bots
+# insistentes recebem 429 sem nem tocar no arquivo.
+#
+# Atrás de um proxy reverso, request.remote_addr é o endereço do proxy e
+# todos os clientes dividiriam o mesmo bucket de IP: configure
+# TRUSTED_PROXIES (ver create_app) com o número de proxies na frente.
+# ====================================================================
+
+# endpoint -> {'ip': (capacidade, tokens por segundo), 'usuario': (...), 'conta': (...)}; só POST é limitado
+# 'conta' usa o e-mail enviado no login junto com o IP, e o token é devolvido quando o
+# login dá certo (reembolsar_conta): só as falhas contam, e um atacante em outro IP
+# não consegue bloquear o dono da conta
+REGRAS_PADRAO = {
+    'main_bp.login': {'ip': (10, 10 / 60), 'conta': (5, 5 / 300)},
+    'main_bp.register': {'ip': (5, 5 / 600)},
+    'main_bp.reservar': {'ip': (30, 30 / 60), 'usuario': (10, 10 / 60)},
+}
+
+# Buckets parados há mais que isto são apagados de tempos em tempos
+EXPIRACAO_SEGUNDOS = 3600
+LIMPEZA_A_CADA = 10000
+
+SQL_CONSUMIR = '''
+INSERT INTO buckets (chave, tokens, atualizado) VALUES (:chave, :capacidade - 1, :agora)
+ON CONFLICT(chave) DO UPDATE SET
+    tokens = MAX(-1, MIN(:capacidade, tokens + (:agora - atualizado) * :taxa) - 1),
+    atualizado = :agora
+RETURNING tokens
+'''
+
+SQL_REEMBOLSAR = 'UPDATE buckets SET tokens = MIN(:capacidade, tokens + 1) WHERE chave = :chave'
+
+
+class LimitadorTokens:
+
+    def __init__(self):
+        self._local = threading.local()
+        self._negados = {}
+        self.metricas = Counter()
+        self._checagens = 0
+        self._caminho = None
+        self._regras = {}
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        app.config.setdefault('RATELIMIT_STORAGE', os.path.join(app.instance_path, 'ratelimit.db'))
+        app.config.setdefault('RATELIMIT_RULES', REGRAS_PADRAO)
+        self._caminho = app.config['RATELIMIT_STORAGE']
+        self._regras = app.config['RATELIMIT_RULES']
+        if self._caminho != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self._caminho)), exist_ok=True)
+        # Antes de todos os outros before_request (e antes do user_loader)
+        app.before_request_funcs.setdefault(None, []).insert(0, self.verificar)
+
+    # -------------------------
+    # Armazenamento compartilhado
+    # -------------------------
+    def _conexao(self):
+        """Uma conexão por thread (e por processo, após fork)."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid() or getattr(local, 'caminho', None) != self._caminho:
+            if self._caminho == ':memory:':
+                # Em memória: compartilhado só entre os threads deste processo
+                conexao = sqlite3.connect('file:ratelimit?mode=memory&cache=shared', uri=True,
+                                          isolation_level=None, check_same_thread=False)
+            else:
+                conexao = sqlite3.connect(self._caminho, isolation_level=None, timeout=1,
+                                          check_same_thread=False)
+                conexao.execute('PRAGMA journal_mode=WAL')
+                conexao.execute('PRAGMA synchronous=OFF')
+            conexao.execute(
+                'CREATE TABLE IF NOT EXISTS buckets '
+                '(chave TEXT PRIMARY KEY, tokens REAL NOT NULL, atualizado REAL NOT NULL) WITHOUT ROWID'
+            )
+            local.conexao, local.pid, local.caminho = conexao, os.getpid(), self._caminho
+        return local.conexao
+
+    def consumir(self, chave, capacidade, taxa):
+        """Tenta consumir um token. Retorna 0 se permitido, senão os segundos até o próximo token."""
+        agora = time.time()
+        liberado_em = self._negados.get(chave)
+        if liberado_em is not None:
+            if agora < liberado_em:
+                self.metricas['negado_local'] += 1
+                return liberado_em - agora
+            self._negados.pop(chave, None)
+
+        conexao = self._conexao()
+        tokens = conexao.execute(
+            SQL_CONSUMIR, {'chave': chave, 'capacidade': capacidade, 'taxa': taxa, 'agora': agora}
+        ).fetchone()[0]
+
+        self._checagens += 1
+        if self._checagens % LIMPEZA_A_CADA == 0:
+            conexao.execute('DELETE FROM buckets WHERE atualizado < ?', (agora - EXPIRACAO_SEGUNDOS,))
+            # list(): outros threads gravam em _negados enquanto isto roda
+            self._negados = {k: v for k, v in list(self._negados.items()) if v > agora}
+
+        if tokens >= 0:
+            return 0
+        espera = (1 - tokens) / taxa
+        self._negados[chave] = agora + espera
+        self.metricas['negado_compartilhado'] += 1
+        return espera
+
+    # -------------------------
+    # Hook de request
+    # -------------------------
+    def verificar(self):
+        if request.method != 'POST' or not current_app.config['RATELIMIT_ENABLED']:
+            return None
+        regras = self._regras.get(request.endpoint)
+        if not regras:
+            return None
+
+        chaves = []
+        if 'ip' in regras:
+            chaves.append((f'ip:{request.endpoint}:{request.remote_addr}', regras['ip']))
+        if 'usuario' in regras:
+            # _user_id é gravado pelo Flask-Login na sessão: não carrega o usuário do banco
+            user_id = session.get('_user_id')
+            if user_id:
+                chaves.append((f'usuario:{request.endpoint}:{user_id}', regras['usuario']))
+        if 'conta' in regras:
+            # Só o campo do formulário: nada de bcrypt nem consulta ao banco
+            conta = (request.form.get('email') or '').strip().lower()
+            if conta:
+                chave_conta = f'conta:{request.endpoint}:{conta}:{request.remote_addr}'
+                chaves.append((chave_conta, regras['conta']))
+                g.limitador_conta = (chave_conta, regras['conta'][0])
+
+        for chave, (capacidade, taxa) in chaves:
+            espera = self.consumir(chave, capacidade, taxa)
+            if espera:
+                self.metricas[f'429:{request.endpoint}'] += 1
+                return Response(
+                    'Muitas tentativas. Aguarde e tente novamente.',
+                    status=429,
+                    headers={'Retry-After': str(max(1, round(espera)))},
+                    mimetype='text/plain',
+                )
+        self.metricas[f'permitido:{request.endpoint}'] += 1
+        return None
+
+    def reembolsar_conta(self):
+        """Login bem-sucedido: devolve o token da conta cobrado neste request."""
+        chave, capacidade = g.pop('limitador_conta', (None, None))
+        if chave is None:
+            return
+        self._negados.pop(chave, None)
+        self._conexao().execute(SQL_REEMBOLSAR, {'chave': chave, 'capacidade': capacidade})
+
+    def resumo(self):
+        """Contadores deste processo (cada worker tem os seus)."""
+        return {
+            'pid': os.getpid(),
+            'chaves_negadas_localmente': len(self._negados),
+            'contadores': dict(self.metricas),
+        }
+
+
+limitador = LimitadorTokens()
@@ -1,15 +1,25 @@
 # C:\projetos\sistema de reservas\reservas\routes.py
 
-from flask import Blueprint, render_template, url_for, flash, redirect, request
+import threading
+
+from flask import Blueprint, render_template, url_for, flash, redirect, request, jsonify, abort, Response, stream_with_context, current_app
 from flask_login import current_user, login_user, logout_user, login_required
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta, timezone
 
 # Importações Locais
-from .forms import RegistrationForm, LoginForm, ReservaForm 
-from .models import Usuario, Reserva, Room
+from .forms import RegistrationForm, LoginForm, ReservaForm, DURACOES_HORAS 
+from .models import Usuario, Reserva
 from . import bcrypt # Importa o bcrypt que está no __init__
 from .extensions import db # Importa o db que está no extensions
+from .availability import disponibilidade
+from .cache import invalidacao
+from .catalog import catalogo_salas
+from .routing import somente_leitura
+from .ratelimit import limitador
+from .decorators import admin_required
+from .events import barramento, leitor_eventos, verificador_sessoes, publicar_reserva, RESERVA_CRIADA, RESERVA_CANCELADA, RECARREGAR
 
 
 # Define o Blueprint para as rotas principais
@@ -42,9 +52,11 @@ def register():
             db.session.commit()
             flash(f'Conta criada com sucesso para {form.username.data}!', 'success')
             return redirect(url_for('.login'))
-        except IntegrityError:
+        except IntegrityError as e:
             db.session.rollback()
-            flash('Erro: Usuário ou e-mail já existe.', 'danger')
+            # Mesmo erro de campo das pré-checagens (que podem estar desligadas sob carga)
+            if not form.aplicar_erro_unicidade(e):
+                flash('Erro: Usuário ou e-mail já existe.', 'danger')
         except Exception as e:
             db.session.rollback()
             flash(f'Ocorreu um erro inesperado: {e}', 'danger')
@@ -68,6 +80,8 @@ def login():
         if user and user_password_bytes and bcrypt.check_password_hash(user_password_bytes, form.password.data):
         
             login_user(user, remember=form.remember.data)
+            # Só tentativas falhas contam no limite por conta
+            limitador.reembolsar_conta()
             next_page = request.args.get('next')
             flash('Login realizado com sucesso!', 'success')
             return redirect(next_page or url_for('.index'))
@@ -83,23 +97,31 @@ def logout():
     flash('Você saiu da sua conta.', 'info')
     return redirect(url_for('.index'))
 
+# ----------------------
+# Métricas do Limitador de Requisições (Admin)
+# ----------------------
+@main_bp.route("/metricas/limitador")
+@login_required
+@admin_required
+def metricas_limitador():
+    return jsonify(limitador.resumo())
+
 # ----------------------
 # Listar Salas
 # ----------------------
 @main_bp.route("/salas")
 @login_required
+@somente_leitura
 def listar_salas():
-    salas = Room.query.filter_by(is_active=True).all()
+    salas = catalogo_salas.atual().ativas
     agora = datetime.now(timezone.utc) 
 
+    # Uma única consulta (intervalo inteiro sobre end_minute) para todas as salas
+    ocupadas = Reserva.salas_ocupadas(agora)
+
     salas_com_status = []
     for sala in salas:
-        reserva_ativa = Reserva.query.filter(
-            Reserva.room_id == sala.id,
-            Reserva.start_time <= agora,
-            Reserva.end_time >= agora,
-            Reserva.status == 'reserved'
-        ).first()
+        reserva_ativa = sala.id in ocupadas
 
         salas_com_status.append({
             'id': sala.id,
@@ -111,6 +133,89 @@ def listar_salas():
 
     return render_template("salas.html", salas=salas_com_status)
 
+# ----------------------
+# Stream de Status das Salas (Server-Sent Events)
+# ----------------------
+HEARTBEAT_SEGUNDOS = 15
+# Espera sugerida aos painéis recusados por excesso de streams
+RETRY_STREAM_CHEIO_SEGUNDOS = 30
+
+
+class ContadorStreams:
+    """Streams SSE abertos neste worker."""
+
+    def __init__(self):
+        self.abertos = 0
+        self._lock = threading.Lock()
+
+    def entrar(self):
+        with self._lock:
+            self.abertos += 1
+
+    def sair(self):
+        with self._lock:
+            self.abertos -= 1
+
+
+streams_abertos = ContadorStreams()
+
+@main_bp.route("/salas/eventos")
+@login_required
+def eventos_salas():
+    # Cada stream segura um thread enquanto o painel estiver aberto: acima do limite,
+    # recusa em vez de deixar as outras páginas sem thread para atender
+    if streams_abertos.abertos >= current_app.config['SSE_MAX_STREAMS']:
+        return Response(
+            f"retry: {RETRY_STREAM_CHEIO_SEGUNDOS * 1000}\n\n",
+            status=503,
+            mimetype='text/event-stream',
+            headers={'Retry-After': str(RETRY_STREAM_CHEIO_SEGUNDOS), 'Cache-Control': 'no-cache'},
+        )
+
+    # Retomada: header padrão do EventSource ou ?last_event_id= (reconexão manual)
+    ultimo_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    try:
+        ultimo_id = int(ultimo_id) if ultimo_id is not None else barramento.ultimo_id
+    except ValueError:
+        ultimo_id = barramento.ultimo_id
+
+    def gerar(ultimo_id):
+        # Contado aqui (e não na view): um gerador que nunca começou não executa o finally
+        streams_abertos.entrar()
+        try:
+            yield "retry: 3000\n\n"
+            if ultimo_id > barramento.ultimo_id:
+                # O cliente veio de um worker que já leu eventos mais novos da tabela
+                leitor_eventos.sincronizar()
+            if ultimo_id > barramento.ultimo_id:
+                pendentes = None  # Id que a tabela não conhece (banco recriado)
+            elif barramento.perdeu_eventos(ultimo_id):
+                pendentes = leitor_eventos.historico(ultimo_id)
+            else:
+                pendentes = barramento.desde(ultimo_id)
+            if pendentes is None:
+                # Eventos que nem a tabela guarda mais: o cliente deve recarregar a lista completa
+                ultimo_id = barramento.ultimo_id
+                yield f"id: {ultimo_id}\nevent: {RECARREGAR}\ndata: {{}}\n\n"
+                pendentes = barramento.desde(ultimo_id)
+            while True:
+                for evento in pendentes:
+                    ultimo_id = evento.id
+                    yield evento.sse()
+                verificador_sessoes.verificar()
+                invalidacao.verificar()
+                pendentes = barramento.aguardar(ultimo_id, timeout=HEARTBEAT_SEGUNDOS)
+                if not pendentes:
+                    yield ": heartbeat\n\n"
+        finally:
+            streams_abertos.sair()
+
+    return Response(
+        stream_with_context(gerar(ultimo_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
 # ----------------------
 # Fazer Reserva
 # ----------------------
@@ -120,16 +225,16 @@ def reservar():
     sala_id_arg = request.args.get("sala_id", type=int)
     form = ReservaForm() 
 
-    # 1. Popular o SelectField 'sala'
-    salas = Room.query.filter_by(is_active=True).all()
-    form.sala.choices = [(s.id, s.name) for s in salas]
+    # 1. Popular o SelectField 'sala' (snapshot compartilhado, sem consulta)
+    catalogo = catalogo_salas.atual()
+    form.sala.choices = catalogo.choices
     
     sala_selecionada = None
 
     # Pré-selecionar a sala
-    if sala_id_arg and sala_id_arg in [s.id for s in salas]:
+    if sala_id_arg and catalogo.ativa(sala_id_arg):
         form.sala.data = sala_id_arg
-        sala_selecionada = db.session.get(Room, sala_id_arg) 
+        sala_selecionada = catalogo.ativa(sala_id_arg)
 
     if form.validate_on_submit():
         inicio = form.inicio.data
@@ -147,12 +252,7 @@ def reservar():
         
         else: 
             # Checa conflito
-            conflito = Reserva.query.filter(
-                Reserva.room_id == room_id,
-                Reserva.status == 'reserved',
-                Reserva.start_time < fim,
-                Reserva.end_time > inicio
-            ).first()
+            conflito = Reserva.conflito(room_id, inicio, fim)
 
             if conflito:
                 flash("A sala já está reservada nesse horário.", "danger")
@@ -169,6 +269,7 @@ def reservar():
             )
             db.session.add(nova_reserva)
             db.session.commit()
+            publicar_reserva(RESERVA_CRIADA, nova_reserva)
             flash("Reserva realizada com sucesso!", "success")
             return redirect(url_for('.minhas_reservas')) 
 
@@ -182,17 +283,55 @@ def reservar():
         sala_nome=sala_selecionada.name if sala_selecionada else None
     )
 
+# ----------------------
+# Calendário de Disponibilidade (JSON)
+# ----------------------
+@main_bp.route("/salas/<int:sala_id>/disponibilidade")
+@login_required
+def disponibilidade_sala(sala_id):
+    if not catalogo_salas.atual().ativa(sala_id):
+        abort(404)
+
+    hoje = datetime.now(timezone.utc).date()
+    try:
+        primeiro_dia = datetime.strptime(request.args['inicio'], '%Y-%m-%d').date() if 'inicio' in request.args else hoje
+    except ValueError:
+        abort(400)
+    primeiro_dia = max(primeiro_dia, hoje)
+    dias = min(max(request.args.get('dias', 7, type=int), 1), 31)
+
+    calendario = disponibilidade.calendario(sala_id, primeiro_dia, dias)
+
+    # Checagem opcional de um horário específico: ?horario=AAAA-MM-DDTHH:MM&duracao=2
+    horario = request.args.get('horario')
+    if horario:
+        # Mesmas durações do formulário de reserva (1 a 4 horas)
+        duracao = request.args.get('duracao', 1, type=int)
+        if duracao not in DURACOES_HORAS:
+            abort(400, description=f'duracao deve estar entre {DURACOES_HORAS[0]} e {DURACOES_HORAS[-1]} horas')
+        try:
+            inicio = datetime.strptime(horario, '%Y-%m-%dT%H:%M').replace(tzinfo=timezone.utc)
+            fim = inicio + timedelta(hours=duracao)
+        except (ValueError, OverflowError):
+            abort(400)
+        calendario['livre'] = disponibilidade.livre(sala_id, inicio, fim)
+
+    return jsonify(calendario)
+
 # ----------------------
 # Minhas Reservas
 # ----------------------
 @main_bp.route("/minhas_reservas")
 @login_required
+@somente_leitura
 def minhas_reservas():
     agora_utc = datetime.now(timezone.utc) 
-    reservas = Reserva.query.filter_by(
+    reservas = Reserva.query.options(
+        joinedload(Reserva.room)
+    ).filter_by(
         user_id=current_user.id
     ).order_by(
-        Reserva.start_time.asc()
+        Reserva.start_minute.asc()
     ).all()
     
     return render_template(
@@ -226,6 +365,7 @@ def cancelar_reserva(reserva_id):
     reserva.cancelled_at = datetime.now(timezone.utc)
     
     db.session.commit()
+    publicar_reserva(RESERVA_CANCELADA, reserva)
     flash(f"Reserva #{reserva.id} cancelada com sucesso!", "success")
     
     return redirect(url_for('.minhas_reservas'))
\ No newline at end of file
@@ -0,0 +1,103 @@
+import os
+import time
+from functools import wraps
+
+from flask import g, has_request_context, current_app, session as sessao_http
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+
+# ====================================================================
+# ROTEAMENTO LEITURA/ESCRITA
+# Views marcadas com @somente_leitura consultam um engine separado de
+# leitura (por padrão a mesma base SQLite aberta em modo somente leitura,
+# com o banco em WAL para que leitores não bloqueiem as escritas; ou uma
+# réplica via SQLALCHEMY_READ_URI). Tudo o que escreve vai para o primário.
+#
+# Read-your-writes: depois de um commit com escrita, o navegador do usuário
+# fica "grudado" no primário por READ_YOUR_WRITES_SECONDS, para não ver uma
+# réplica atrasada logo após reservar.
+# ====================================================================
+
+CHAVE_MOTOR = 'motor_leitura'
+CHAVE_STICKY = '_ler_primario_ate'
+
+
+class RoutingSession(Session):
+    """Sessão do Flask-SQLAlchemy que manda as leituras das views somente-leitura ao engine de leitura."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _usar_leitura(self):
+            motor = current_app.extensions.get(CHAVE_MOTOR)
+            if motor is not None:
+                return motor
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _usar_leitura(sessao):
+    if not has_request_context() or not g.get('somente_leitura'):
+        return False
+    # Escrita pendente ou já enviada nesta transação: lê do primário para enxergá-la
+    if sessao.info.get('escreveu') or sessao.new or sessao.dirty or sessao.deleted:
+        return False
+    return sessao_http.get(CHAVE_STICKY, 0) < time.time()
+
+
+def executar_no_primario(consulta):
+    """Executa na sessão atual, mas sempre no primário.
+
+    Para montar os caches compartilhados do processo (catálogo, disponibilidade,
+    unicidade): eles costumam ser remontados dentro de views @somente_leitura, e uma
+    réplica atrasada em relação ao aviso de invalidação deixaria o cache velho até a
+    próxima mudança.
+    """
+    db = current_app.extensions['sqlalchemy']
+    return db.session.execute(consulta, bind_arguments={'bind': db.engine})
+
+
+def somente_leitura(f):
+    """Marca a view como somente leitura: suas consultas vão para o engine de leitura."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.somente_leitura = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+# -------------------------
+# Read-your-writes
+# -------------------------
+@event.listens_for(RoutingSession, 'before_flush')
+def _marcar_escrita(sessao, flush_context, instances):
+    # Antes do flush: as escritas do próprio flush (e dos hooks dele) já vão para o primário
+    sessao.info['escreveu'] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _grudar_no_primario(sessao):
+    if sessao.info.pop('escreveu', False) and has_request_context():
+        sessao_http[CHAVE_STICKY] = time.time() + current_app.config['READ_YOUR_WRITES_SECONDS']
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _descartar_escrita(sessao):
+    sessao.info.pop('escreveu', None)
+
+
+# -------------------------
+# Configuração
+# -------------------------
+def init_app(app, db):
+    """Liga o WAL no SQLite primário e cria o engine de leitura (se houver)."""
+    app.config.setdefault('READ_YOUR_WRITES_SECONDS', 5)
+    with app.app_context():
+        url = db.engine.url
+        uri_leitura = app.config.get('SQLALCHEMY_READ_URI')
+        arquivo_sqlite = url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+        if arquivo_sqlite and app.config.get('SQLITE_WAL', True):
+            with db.engine.connect() as conn:
+                conn.execute(text('PRAGMA journal_mode=WAL'))
+
+        if not uri_leitura and arquivo_sqlite:
+            uri_leitura = f'sqlite:///file:{os.path.abspath(url.database)}?mode=ro&uri=true'
+
+    if uri_leitura:
+        app.extensions[CHAVE_MOTOR] = create_engine(uri_leitura)
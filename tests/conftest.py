@@ -0,0 +1,163 @@
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+# Importações Locais
+from .. import create_app
+from ..extensions import db, bcrypt
+from ..models import Usuario, Reserva, Room
+from ..routing import CHAVE_MOTOR
+
+# ====================================================================
+# BASE SEMEADA PARA OS TESTES DE DESEMPENHO
+# Um app só para a sessão inteira (os caches do processo são singletons),
+# com um SQLite em arquivo temporário: o mesmo caminho de produção, com
+# WAL e engine de leitura separado.
+# ====================================================================
+
+NUM_SALAS = 6
+NUM_USUARIOS = 20
+NUM_RESERVAS = 600
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    base = tmp_path_factory.mktemp('reservas')
+
+    class ConfigTeste:
+        TESTING = True
+        SECRET_KEY = 'teste'
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{base / 'teste.db'}"
+        WTF_CSRF_ENABLED = False
+        BCRYPT_LOG_ROUNDS = 4
+        RATELIMIT_ENABLED = False
+        RATELIMIT_STORAGE = ':memory:'
+        ANALYTICS_DIR = str(base / 'analytics')
+
+    app = create_app(ConfigTeste)
+    with app.app_context():
+        _semear()
+    return app
+
+
+def _semear():
+    senha = bcrypt.generate_password_hash('senha123').decode('utf-8')
+    usuarios = [Usuario(username='admin', email='admin@teste.com', password=senha, is_admin=True)]
+    usuarios += [
+        Usuario(username=f'user{i}', email=f'user{i}@teste.com', password=senha)
+        for i in range(NUM_USUARIOS)
+    ]
+    salas = [Room(name=f'Sala {i}', description='Sala de teste', capacity=4 + i) for i in range(NUM_SALAS)]
+    db.session.add_all(usuarios + salas)
+    db.session.flush()
+
+    # Passadas, em andamento e futuras (algumas canceladas), espalhadas por ~2 meses
+    agora = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    reservas = []
+    for i in range(NUM_RESERVAS):
+        inicio = agora + timedelta(hours=(i - NUM_RESERVAS // 2) * 2)
+        reservas.append(Reserva(
+            room_id=salas[i % NUM_SALAS].id,
+            user_id=usuarios[1 + i % NUM_USUARIOS].id,
+            client_name=usuarios[1 + i % NUM_USUARIOS].username,
+            start_time=inicio,
+            end_time=inicio + timedelta(hours=1 + i % 3),
+            status='cancelled' if i % 7 == 0 else 'reserved',
+        ))
+    db.session.add_all(reservas)
+    db.session.commit()
+
+
+def _logar(app, username):
+    with app.app_context():
+        user_id = db.session.execute(db.select(Usuario.id).where(Usuario.username == username)).scalar_one()
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['_user_id'] = str(user_id)
+        sessao['_fresh'] = True
+    return cliente
+
+
+@pytest.fixture
+def cliente_usuario(app):
+    return _logar(app, 'user1')
+
+
+@pytest.fixture
+def cliente_admin(app):
+    return _logar(app, 'admin')
+
+
+# -------------------------
+# Captura de SQL
+# -------------------------
+class ConsultasCapturadas:
+    """SQL executado nos engines da aplicação (primário e leitura) durante o bloco."""
+
+    def __init__(self):
+        self.consultas = []
+
+    def __len__(self):
+        return len(self.consultas)
+
+    def _registrar(self, conn, cursor, statement, parameters, context, executemany):
+        self.consultas.append((statement, parameters))
+
+    def selects(self, padrao=None):
+        """SELECTs capturados; `padrao` (regex) filtra pelo texto do SQL."""
+        return [
+            (sql, params) for sql, params in self.consultas
+            if sql.lstrip().upper().startswith('SELECT') and (padrao is None or re.search(padrao, sql, re.S))
+        ]
+
+    def resumo(self):
+        return '\n'.join(f'  {i + 1}. {" ".join(sql.split())[:160]}' for i, (sql, _) in enumerate(self.consultas))
+
+
+@pytest.fixture
+def capturar_sql(app):
+    with app.app_context():
+        motores = [db.engine]
+    if app.extensions.get(CHAVE_MOTOR) is not None:
+        motores.append(app.extensions[CHAVE_MOTOR])
+
+    @contextmanager
+    def capturar():
+        capturadas = ConsultasCapturadas()
+        for motor in motores:
+            event.listen(motor, 'before_cursor_execute', capturadas._registrar)
+        try:
+            yield capturadas
+        finally:
+            for motor in motores:
+                event.remove(motor, 'before_cursor_execute', capturadas._registrar)
+
+    return capturar
+
+
+# -------------------------
+# Escritas de "outro worker"
+# -------------------------
+@pytest.fixture
+def escrever_como_outro_worker(app):
+    """Grava por uma conexão sqlite3 própria, como outro processo faria: executa os
+    comandos (sql, parâmetros) e incrementa a versão do namespace, numa só transação."""
+    with app.app_context():
+        caminho = db.engine.url.database
+
+    def escrever(namespace, *comandos):
+        conexao = sqlite3.connect(caminho, isolation_level=None)
+        try:
+            conexao.execute('BEGIN')
+            for sql, parametros in comandos:
+                conexao.execute(sql, parametros)
+            conexao.execute('UPDATE cache_versions SET versao = versao + 1 WHERE namespace = ?', (namespace,))
+            conexao.execute('COMMIT')
+        finally:
+            conexao.close()
+
+    return escrever
@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta, timezone
+
+# Importações Locais
+from ..extensions import db
+from ..models import Reserva, Usuario
+
+
+def test_lapides_de_reservas_respeitam_o_dono(app, cliente_usuario, cliente_admin):
+    inicio = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=500)
+    with app.app_context():
+        outro = db.session.execute(db.select(Usuario).where(Usuario.username == 'user3')).scalar_one()
+        reserva = Reserva(room_id=1, user_id=outro.id, client_name=outro.username,
+                          start_time=inicio, end_time=inicio + timedelta(hours=1))
+        db.session.add(reserva)
+        db.session.commit()
+        reserva_id = reserva.id
+        db.session.delete(reserva)
+        db.session.commit()
+
+    # Página grande o bastante para cobrir toda a base semeada
+    do_usuario = cliente_usuario.get('/api/v1/reservas?desde=0&limite=2000').get_json()
+    do_admin = cliente_admin.get('/api/v1/reservas?desde=0&limite=2000').get_json()
+
+    assert reserva_id not in do_usuario['removidos']
+    assert reserva_id in do_admin['removidos']
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta, timezone
+
+# Importações Locais
+from ..availability import disponibilidade
+from ..events import publicar_reserva, RESERVA_CRIADA, RESERVA_CANCELADA
+from ..extensions import db
+from ..models import Reserva, Usuario
+
+
+def test_reconstrucao_entre_commit_e_evento_nao_conta_a_reserva_duas_vezes(app):
+    inicio = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=400)
+    fim = inicio + timedelta(hours=1)
+    with app.test_request_context():
+        usuario = db.session.execute(db.select(Usuario).where(Usuario.username == 'user2')).scalar_one()
+        reserva = Reserva(room_id=3, user_id=usuario.id, client_name=usuario.username,
+                          start_time=inicio, end_time=fim, status='reserved')
+        db.session.add(reserva)
+        db.session.commit()
+
+        # Outro thread reconstrói o índice antes do publicar_reserva: ele já contém a reserva
+        disponibilidade.invalidar()
+        assert not disponibilidade.livre(3, inicio, fim)
+        publicar_reserva(RESERVA_CRIADA, reserva)
+
+        reserva.status = 'cancelled'
+        db.session.commit()
+        publicar_reserva(RESERVA_CANCELADA, reserva)
+
+        assert disponibilidade.livre(3, inicio, fim)
+
+
+def test_checagem_de_horario_recusa_duracao_fora_do_formulario(cliente_usuario):
+    base = '/salas/1/disponibilidade?horario=2030-01-01T10:00'
+    assert cliente_usuario.get(base + '&duracao=2').status_code == 200
+    for duracao in ('0', '-3', '5', '100000000'):
+        assert cliente_usuario.get(f'{base}&duracao={duracao}').status_code == 400
+    assert cliente_usuario.get('/salas/1/disponibilidade?horario=9999-12-31T23:00&duracao=4').status_code == 400
@@ -0,0 +1,85 @@
+import json
+from itertools import islice
+
+# Importações Locais
+from ..cache import invalidacao
+from ..extensions import db
+from ..events import barramento, leitor_eventos, RESERVA_CRIADA, RESERVA_CANCELADA, RESERVA_ALTERADA
+from ..models import EventoReserva
+from ..routes import streams_abertos
+
+# ====================================================================
+# EVENTOS DE OUTROS WORKERS
+# Uma reserva feita em outro processo deve chegar aos streams deste como o
+# evento concreto (reserva_criada/reserva_cancelada), e não como um
+# reserva_alterada genérico que faz todos os painéis recarregarem /salas.
+# O id SSE é o id de eventos_reserva, igual em todos os workers.
+# ====================================================================
+
+def _evento(tipo, reserva_id):
+    dados = {'reserva_id': reserva_id, 'sala_id': 1,
+             'inicio': '2030-01-01T10:00:00+00:00', 'fim': '2030-01-01T11:00:00+00:00'}
+    return ('INSERT INTO eventos_reserva (origem, tipo, dados) VALUES (?, ?, ?)', (-1, tipo, json.dumps(dados)))
+
+
+def _ids_gravados(app, reserva_id):
+    with app.app_context():
+        return db.session.execute(
+            db.select(EventoReserva.id).where(EventoReserva.dados.contains(f'"reserva_id": {reserva_id},'))
+            .order_by(EventoReserva.id)
+        ).scalars().all()
+
+
+def test_reserva_em_outro_worker_chega_como_evento_concreto(app, escrever_como_outro_worker):
+    with app.test_request_context():
+        invalidacao.verificar()
+        leitor_eventos.sincronizar()  # Reservas semeadas pelo conftest
+        antes = barramento.ultimo_id
+
+        escrever_como_outro_worker('reservations', _evento(RESERVA_CRIADA, 9001))
+        escrever_como_outro_worker('reservations', _evento(RESERVA_CANCELADA, 9001))
+        invalidacao.verificar()
+
+    eventos = barramento.desde(antes)
+    assert [e.tipo for e in eventos] == [RESERVA_CRIADA, RESERVA_CANCELADA]
+    assert all(e.dados['reserva_id'] == 9001 for e in eventos)
+    assert RESERVA_ALTERADA not in {e.tipo for e in eventos}
+    assert [e.id for e in eventos] == _ids_gravados(app, 9001)
+
+
+def test_stream_retoma_em_outro_worker_pelo_id_da_tabela(app, cliente_usuario, escrever_como_outro_worker):
+    with app.test_request_context():
+        invalidacao.verificar()
+        visto_pelo_cliente = barramento.ultimo_id
+        escrever_como_outro_worker('reservations', _evento(RESERVA_CRIADA, 9002))
+        escrever_como_outro_worker('reservations', _evento(RESERVA_CANCELADA, 9002))
+        invalidacao.verificar()
+        # Worker que subiu depois desses eventos: buffer vazio, começa do fim da tabela
+        barramento.posicionar(barramento.ultimo_id)
+
+    resposta = cliente_usuario.get(
+        '/salas/eventos', headers={'Last-Event-ID': str(visto_pelo_cliente)}, buffered=False
+    )
+    try:
+        blocos = [b.decode() for b in islice(resposta.response, 3)]
+    finally:
+        resposta.close()
+    assert streams_abertos.abertos == 0
+
+    assert blocos[0].startswith('retry:')
+    ids = [int(b.split('\n')[0].removeprefix('id: ')) for b in blocos[1:]]
+    assert ids == _ids_gravados(app, 9002)
+    assert [b.split('\n')[1] for b in blocos[1:]] == [f'event: {RESERVA_CRIADA}', f'event: {RESERVA_CANCELADA}']
+
+
+def test_stream_acima_do_limite_recebe_503_com_retry(app, cliente_usuario):
+    limite = app.config['SSE_MAX_STREAMS']
+    app.config['SSE_MAX_STREAMS'] = 0
+    try:
+        resposta = cliente_usuario.get('/salas/eventos')
+    finally:
+        app.config['SSE_MAX_STREAMS'] = limite
+
+    assert resposta.status_code == 503
+    assert resposta.headers['Retry-After']
+    assert resposta.get_data(as_text=True).startswith('retry:')
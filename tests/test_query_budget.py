@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# ====================================================================
+# ORÇAMENTO DE CONSULTAS POR REQUEST
+# Cada rota quente é chamada uma vez para aquecer os caches do processo
+# (catálogo de salas, filtros de unicidade) e depois medida. Um N+1 novo
+# ou um cache que deixou de ser usado estoura o orçamento.
+# Conta tudo o que passa pelos engines da aplicação, inclusive o
+# carregamento do usuário pelo Flask-Login (1 consulta).
+# ====================================================================
+
+# (cliente, rota) -> máximo de consultas SQL
+ORCAMENTOS = [
+    ('cliente_usuario', '/salas', 2),
+    ('cliente_usuario', '/reservar', 1),
+    ('cliente_usuario', '/minhas_reservas', 2),
+    ('cliente_admin', '/admin/', 4),
+    ('cliente_admin', '/admin/view_relatorio_final/', 2),
+]
+
+# Usuário + conflito + versões (sync e cache) + INSERT + evento p/ outros workers + leitura da linha nova
+ORCAMENTO_RESERVA = 9
+
+
+@pytest.mark.parametrize('nome_cliente, rota, maximo', ORCAMENTOS)
+def test_orcamento_de_consultas(request, capturar_sql, nome_cliente, rota, maximo):
+    cliente = request.getfixturevalue(nome_cliente)
+    assert cliente.get(rota).status_code == 200
+
+    with capturar_sql() as consultas:
+        resposta = cliente.get(rota)
+
+    assert resposta.status_code == 200
+    assert len(consultas) <= maximo, (
+        f'{rota} fez {len(consultas)} consultas (máximo {maximo}):\n{consultas.resumo()}'
+    )
+
+
+def test_orcamento_de_consultas_ao_reservar(cliente_usuario, capturar_sql):
+    cliente_usuario.get('/reservar')
+    # Bem no futuro, para não colidir com a base semeada nem com outros testes
+    inicio = datetime.now(timezone.utc).replace(second=0, microsecond=0) + timedelta(days=200)
+
+    with capturar_sql() as consultas:
+        resposta = cliente_usuario.post('/reservar', data={
+            'sala': 1, 'inicio': inicio.strftime('%Y-%m-%dT%H:%M'), 'duracao': '1',
+        })
+
+    assert resposta.status_code == 302
+    assert resposta.headers['Location'].endswith('/minhas_reservas')
+    assert len(consultas) <= ORCAMENTO_RESERVA, (
+        f'POST /reservar fez {len(consultas)} consultas (máximo {ORCAMENTO_RESERVA}):\n{consultas.resumo()}'
+    )
+
+
+def test_minhas_reservas_nao_cresce_com_o_numero_de_reservas(cliente_usuario, capturar_sql):
+    # A base semeada dá dezenas de reservas ao user1: o total não pode depender disso
+    with capturar_sql() as consultas:
+        resposta = cliente_usuario.get('/minhas_reservas')
+
+    assert resposta.status_code == 200
+    assert resposta.data.count(b'<tr') > 10
+    assert len(consultas.selects(r'FROM rooms\b')) == 0
+
+
+def test_cadastro_remoto_nao_remonta_o_filtro_de_unicidade(app, capturar_sql, escrever_como_outro_worker):
+    cliente = app.test_client()
+    cliente.get('/register')
+    escrever_como_outro_worker('usuario', (
+        'INSERT INTO usuario (username, email, password, is_admin) VALUES (?, ?, ?, 0)',
+        ('remoto1', 'remoto1@teste.com', 'x' * 60),
+    ))
+
+    # O nome cadastrado pelo outro worker precisa ser reconhecido...
+    with capturar_sql() as consultas:
+        resposta = cliente.post('/register', data={
+            'username': 'remoto1', 'email': 'novo-remoto@teste.com',
+            'password': 'senha123', 'confirm_password': 'senha123',
+        })
+
+    assert resposta.status_code == 200
+    assert 'já está em uso' in resposta.get_data(as_text=True)
+    # ...sem reler a tabela inteira: só as linhas novas (id > último visto) e a checagem pontual
+    leituras = consultas.selects(r'FROM usuario\b')
+    assert leituras and all('WHERE' in sql for sql, _ in leituras), consultas.resumo()
+    assert len(leituras) <= 2, consultas.resumo()
@@ -0,0 +1,97 @@
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# Importações Locais
+from ..extensions import db
+
+# ====================================================================
+# PLANOS DE CONSULTA (EXPLAIN QUERY PLAN)
+# As consultas quentes são capturadas das próprias rotas (SQL e parâmetros
+# reais) e explicadas no SQLite da base semeada. O teste falha se alguma
+# delas cair num SCAN da tabela inteira e também compara o plano com o
+# snapshot em tests/snapshots/query_plans.json.
+#
+# Mudou um índice de propósito? Regenere o snapshot:
+#     UPDATE_SNAPSHOTS=1 python -m pytest tests/test_query_plans.py
+# ====================================================================
+
+ARQUIVO_SNAPSHOT = os.path.join(os.path.dirname(__file__), 'snapshots', 'query_plans.json')
+ATUALIZAR = os.environ.get('UPDATE_SNAPSHOTS') == '1'
+
+# Varreduras "SCAN tabela" sem índice só são aceitas nestas tabelas pequenas
+TABELAS_PEQUENAS = {'rooms', 'cache_versions', 'sync_sequencia'}
+
+
+def _reservar(cliente):
+    inicio = datetime.now(timezone.utc).replace(second=0, microsecond=0) + timedelta(days=300)
+    return cliente.post('/reservar', data={
+        'sala': 2, 'inicio': inicio.strftime('%Y-%m-%dT%H:%M'), 'duracao': '2',
+    })
+
+# nome -> (cliente, como chamar a rota, regex que identifica a consulta no SQL capturado)
+CONSULTAS = {
+    'conflito': ('cliente_usuario', _reservar, r'FROM reservations\s+WHERE reservations\.room_id = \?'),
+    'ocupacao': ('cliente_usuario', lambda c: c.get('/salas'), r'SELECT DISTINCT reservations\.room_id'),
+    'minhas_reservas': ('cliente_usuario', lambda c: c.get('/minhas_reservas'), r'WHERE reservations\.user_id = \?'),
+    'relatorio': ('cliente_admin', lambda c: c.get('/admin/view_relatorio_final/'), r'GROUP BY reservations\.day_key'),
+}
+
+
+def _explicar(app, sql, parametros):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            cursor = conn.connection.driver_connection.execute('EXPLAIN QUERY PLAN ' + sql, parametros)
+            return [detalhe for _id, _pai, _livre, detalhe in cursor.fetchall()]
+
+
+def _varreduras_completas(plano):
+    """Linhas 'SCAN <tabela>' que não usam índice algum."""
+    completas = []
+    for linha in plano:
+        encontrado = re.match(r'SCAN (\w+)(?: AS \w+)?$', linha)
+        if encontrado and encontrado.group(1) not in TABELAS_PEQUENAS:
+            completas.append(linha)
+    return completas
+
+
+def _ler_snapshot():
+    if not os.path.exists(ARQUIVO_SNAPSHOT):
+        return {}
+    with open(ARQUIVO_SNAPSHOT, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='module')
+def planos_snapshot():
+    planos = _ler_snapshot()
+    yield planos
+    if ATUALIZAR:
+        with open(ARQUIVO_SNAPSHOT, 'w', encoding='utf-8') as f:
+            json.dump(planos, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+@pytest.mark.parametrize('nome', sorted(CONSULTAS))
+def test_plano_de_consulta(request, app, capturar_sql, planos_snapshot, nome):
+    nome_cliente, chamar, padrao = CONSULTAS[nome]
+    cliente = request.getfixturevalue(nome_cliente)
+
+    with capturar_sql() as consultas:
+        resposta = chamar(cliente)
+    assert resposta.status_code in (200, 302)
+
+    encontradas = consultas.selects(padrao)
+    assert len(encontradas) == 1, f'consulta "{nome}" não identificada:\n{consultas.resumo()}'
+    plano = _explicar(app, *encontradas[0])
+
+    assert not _varreduras_completas(plano), f'"{nome}" varre a tabela inteira: {plano}'
+
+    if ATUALIZAR:
+        planos_snapshot[nome] = plano
+    else:
+        assert nome in planos_snapshot, f'sem snapshot para "{nome}" (rode com UPDATE_SNAPSHOTS=1)'
+        assert plano == planos_snapshot[nome], f'plano de "{nome}" mudou: {plano}'
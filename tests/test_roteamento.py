@@ -0,0 +1,35 @@
+from sqlalchemy import event
+
+# Importações Locais
+from ..catalog import catalogo_salas
+from ..extensions import db
+from ..routing import CHAVE_MOTOR
+
+
+def _sql_por_motor(app):
+    with app.app_context():
+        motores = {'primario': db.engine, 'leitura': app.extensions[CHAVE_MOTOR]}
+    capturado = {nome: [] for nome in motores}
+    ouvintes = []
+    for nome, motor in motores.items():
+        def ouvir(conn, cursor, statement, parameters, context, executemany, nome=nome):
+            capturado[nome].append(statement)
+        event.listen(motor, 'before_cursor_execute', ouvir)
+        ouvintes.append((motor, ouvir))
+    return capturado, ouvintes
+
+
+def test_cache_remontado_em_view_somente_leitura_le_do_primario(app, cliente_usuario):
+    cliente_usuario.get('/salas')
+    catalogo_salas.invalidar()
+    capturado, ouvintes = _sql_por_motor(app)
+    try:
+        assert cliente_usuario.get('/salas').status_code == 200
+    finally:
+        for motor, ouvir in ouvintes:
+            event.remove(motor, 'before_cursor_execute', ouvir)
+
+    # O catálogo (cache do processo) vem do primário; a ocupação da view, da leitura
+    assert any('FROM rooms' in sql for sql in capturado['primario'])
+    assert not any('FROM rooms' in sql for sql in capturado['leitura'])
+    assert any('FROM reservations' in sql for sql in capturado['leitura'])
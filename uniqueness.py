@@ -0,0 +1,227 @@
+import hashlib
+import math
+import threading
+from functools import partial
+
+from sqlalchemy import event, inspect, or_
+
+# Importações Locais
+from .extensions import db
+from .routing import executar_no_primario
+from .models import Usuario, Room
+from .cache import invalidacao
+
+# ====================================================================
+# CAMADA DE UNICIDADE
+# A garantia real continua sendo a constraint UNIQUE do banco. Aqui ficam
+# apenas as pré-checagens baratas: um filtro de existência em memória
+# (Bloom filter) responde "com certeza não existe" sem ir ao banco, e o
+# que sobra é checado numa única consulta.
+# ====================================================================
+
+class FiltroExistencia:
+    """Bloom filter sobre um bytearray: sem falsos negativos, poucos falsos positivos."""
+
+    def __init__(self, capacidade, taxa_falsos_positivos=0.01):
+        capacidade = max(capacidade, 64)
+        self.capacidade = capacidade
+        self.num_bits = int(-capacidade * math.log(taxa_falsos_positivos) / (math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacidade * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.total = 0
+
+    def _posicoes(self, valor):
+        digest = hashlib.blake2b(valor.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, valor):
+        for pos in self._posicoes(valor):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.total += 1
+
+    def __contains__(self, valor):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._posicoes(valor))
+
+    @property
+    def saturado(self):
+        return self.total > self.capacidade
+
+
+class VerificadorUnicidade:
+    """Mantém os filtros de existência quentes para os campos únicos da aplicação."""
+
+    # tabela -> (modelo, colunas únicas); cada campo do filtro é 'tabela.coluna'
+    TABELAS = {
+        Usuario.__tablename__: (Usuario, ('username', 'email')),
+        Room.__tablename__: (Room, ('name',)),
+    }
+    # Poucas linhas, escritas só pelo admin e sem UNIQUE no banco: relidas inteiras
+    # quando outro worker escreve (pegam também as renomeações)
+    RECARREGAR = {Room.__tablename__}
+
+    def __init__(self):
+        self._filtros = None
+        self._ultimo_id = {}
+        self._pendentes = set()
+        self._lock = threading.Lock()
+
+    def _ler(self, tabela, desde_id=0):
+        modelo, colunas = self.TABELAS[tabela]
+        return executar_no_primario(
+            db.select(modelo.id, *[getattr(modelo, c) for c in colunas])
+            .where(modelo.id > desde_id).order_by(modelo.id)
+        ).all()
+
+    def _carregar(self, tabela, filtros, ultimo_id):
+        """Monta do zero os filtros de uma tabela (uma consulta)."""
+        colunas = self.TABELAS[tabela][1]
+        linhas = self._ler(tabela)
+        for i, coluna in enumerate(colunas, 1):
+            filtro = FiltroExistencia(len(linhas) * 2)
+            for linha in linhas:
+                filtro.add(linha[i])
+            filtros[f'{tabela}.{coluna}'] = filtro
+        ultimo_id[tabela] = linhas[-1].id if linhas else 0
+
+    def aquecer(self):
+        """Carrega todos os valores existentes (uma consulta por tabela)."""
+        filtros, ultimo_id = {}, {}
+        for tabela in self.TABELAS:
+            self._carregar(tabela, filtros, ultimo_id)
+        with self._lock:
+            self._filtros, self._ultimo_id = filtros, ultimo_id
+            self._pendentes.clear()
+
+    def invalidar(self):
+        with self._lock:
+            self._filtros = None
+
+    def alterado_em_outro_processo(self, tabela):
+        """Outro worker escreveu na tabela: o filtro é completado no próximo uso, não descartado.
+
+        Enquanto isso ele pode não conhecer um valor novo; a pré-checagem deixa passar e a
+        constraint UNIQUE do banco (aplicar_erro_unicidade) continua garantindo a unicidade.
+        """
+        with self._lock:
+            self._pendentes.add(tabela)
+
+    def _completar(self, tabela):
+        """Acrescenta só as linhas com id acima do último visto (ou relê tabelas de RECARREGAR)."""
+        with self._lock:
+            if tabela not in self._pendentes or self._filtros is None:
+                return
+            self._pendentes.discard(tabela)
+            desde_id = self._ultimo_id.get(tabela, 0)
+
+        if tabela in self.RECARREGAR:
+            filtros, ultimo_id = dict(self._filtros), dict(self._ultimo_id)
+            self._carregar(tabela, filtros, ultimo_id)
+            with self._lock:
+                self._filtros, self._ultimo_id = filtros, ultimo_id
+            return
+
+        colunas = self.TABELAS[tabela][1]
+        linhas = self._ler(tabela, desde_id)
+        if not linhas:
+            return
+        with self._lock:
+            for linha in linhas:
+                for i, coluna in enumerate(colunas, 1):
+                    self._filtros[f'{tabela}.{coluna}'].add(linha[i])
+            self._ultimo_id[tabela] = max(self._ultimo_id.get(tabela, 0), linhas[-1].id)
+
+    def _filtro(self, campo):
+        if self._filtros is None:
+            self.aquecer()
+        tabela = campo.split('.', 1)[0]
+        if tabela in self._pendentes:
+            self._completar(tabela)
+        filtro = self._filtros[campo]
+        if filtro.saturado:
+            self.aquecer()
+            filtro = self._filtros[campo]
+        return filtro
+
+    def talvez_existe(self, campo, valor):
+        """False = certamente não existe no banco; True = precisa consultar."""
+        return valor in self._filtro(campo)
+
+    def registrar(self, campo, valor):
+        filtros = self._filtros
+        if filtros is not None and valor:
+            with self._lock:
+                filtros[campo].add(valor)
+
+    # -------------------------
+    # Checagens
+    # -------------------------
+    def conflitos_usuario(self, username, email):
+        """Retorna o conjunto de campos ('username'/'email') já usados, numa única consulta."""
+        condicoes = []
+        if self.talvez_existe('usuario.username', username):
+            condicoes.append(Usuario.username == username)
+        if self.talvez_existe('usuario.email', email):
+            condicoes.append(Usuario.email == email)
+        if not condicoes:
+            return set()
+
+        conflitos = set()
+        linhas = db.session.execute(
+            db.select(Usuario.username, Usuario.email).where(or_(*condicoes)).limit(2)
+        ).all()
+        for linha in linhas:
+            if linha.username == username:
+                conflitos.add('username')
+            if linha.email == email:
+                conflitos.add('email')
+        return conflitos
+
+    def nome_sala_em_uso(self, nome, ignorar_id=None):
+        if not self.talvez_existe('rooms.name', nome):
+            return False
+        query = db.select(Room.id).where(Room.name == nome)
+        if ignorar_id:
+            query = query.where(Room.id != ignorar_id)
+        return db.session.execute(query.limit(1)).first() is not None
+
+
+unicidade = VerificadorUnicidade()
+# Escritas feitas por outros workers: o filtro é completado (não remontado) na próxima checagem
+for _tabela in VerificadorUnicidade.TABELAS:
+    invalidacao.registrar(_tabela, partial(unicidade.alterado_em_outro_processo, _tabela))
+
+
+def campos_violados(erro, tabela, campos):
+    """Traduz um IntegrityError de UNIQUE nos campos do formulário afetados."""
+    mensagem = str(getattr(erro, 'orig', erro)).lower()
+    return {campo for campo in campos if f'{tabela}.{campo}' in mensagem or f'({campo})' in mensagem}
+
+
+# -------------------------
+# Mantém os filtros em dia com as escritas feitas por este processo
+# -------------------------
+@event.listens_for(Usuario, 'after_insert')
+def _registrar_usuario(mapper, connection, target):
+    unicidade.registrar('usuario.username', target.username)
+    unicidade.registrar('usuario.email', target.email)
+
+
+@event.listens_for(Usuario, 'after_update')
+def _atualizar_usuario(mapper, connection, target):
+    # Só o que mudou: updates sem efeito nos campos únicos não inflam a contagem do filtro
+    for coluna in ('username', 'email'):
+        if inspect(target).attrs[coluna].history.has_changes():
+            unicidade.registrar(f'usuario.{coluna}', getattr(target, coluna))
+
+
+@event.listens_for(Room, 'after_insert')
+def _registrar_sala(mapper, connection, target):
+    unicidade.registrar('rooms.name', target.name)
+
+
+@event.listens_for(Room, 'after_update')
+def _atualizar_sala(mapper, connection, target):
+    if inspect(target).attrs.name.history.has_changes():
+        unicidade.registrar('rooms.name', target.name)